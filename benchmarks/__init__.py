@@ -0,0 +1,13 @@
+"""
+Benchmarks for the tokens of dataschema. Each scenario in `benchmarks.scenarios` validates
+(or constructs) a schema at scale, the runner in `benchmarks.runner` measures it and compares
+the results against the baseline stored in `baseline.json`:
+
+	python -m benchmarks                  # Run all scenarios and compare against the baseline
+	python -m benchmarks --quick dict     # Only scenarios containing "dict", with fewer repeats
+	python -m benchmarks --save           # Store the results as new baseline
+
+The baseline depends on the machine and python-version, so store a new one before comparing
+changes on another machine. Store it with python 3, python 2 lacks tracemalloc to measure the
+peak memory.
+"""
@@ -0,0 +1,45 @@
+"""
+Command-line interface of the benchmarks, see `benchmarks/__init__.py`
+"""
+
+from __future__ import print_function
+
+import argparse
+import sys
+
+from benchmarks import runner
+
+
+
+def main(args=None):
+	parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the tokens of dataschema")
+	parser.add_argument("names", nargs="*", help="Only run scenarios containing one of these names")
+	parser.add_argument("--quick", action="store_true", help="Only run the smallest sizes for a short time")
+	parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to repeat each scenario (default: 1)")
+	parser.add_argument("--baseline", default=runner.baseline_path, help="The json-file with the baseline")
+	parser.add_argument("--save", action="store_true", help="Store the results as new baseline")
+	parser.add_argument("--tolerance", type=float, default=0.2, help="Changes of ops/sec within this fraction are ignored (default: 0.2)")
+	parser.add_argument("--check", action="store_true", help="Exit with status 1, if a scenario got slower")
+	args = parser.parse_args(args)
+
+	report = lambda key, results: print(runner.format_results(key, results))
+	if args.quick:
+		results = runner.run(args.names, min_time=0.1, sizes=[1000], report=report)
+	else:
+		results = runner.run(args.names, min_time=args.min_time, report=report)
+
+	if args.save:
+		runner.save_baseline(results, args.baseline)
+		print(u"\nStored {} results in {}".format(len(results), args.baseline))
+		return 0
+
+	comparison = runner.compare(results, runner.load_baseline(args.baseline), args.tolerance)
+	print(u"\nCompared to the baseline (ops/sec):")
+	print(runner.format_comparison(comparison))
+	if args.check and any(verdict == "slower" for key, ratio, verdict in comparison):
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Runs the scenarios of `benchmarks.scenarios` and compares the results against a baseline. For each
+scenario and size the runner records the operations per second, the percentiles of the latency of
+a single operation and the peak memory allocated by one operation (only with tracemalloc, python 3).
+"""
+
+from __future__ import print_function
+
+import gc
+import json
+import os
+import platform
+import timeit
+
+try:
+	import tracemalloc
+except ImportError: # Python 2
+	tracemalloc = None
+
+from benchmarks.scenarios import scenarios
+
+
+baseline_path = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+
+def percentile(latencies, fraction):
+	""" The value below which `fraction` of the sorted `latencies` fall """
+	index = min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))
+	return latencies[index]
+
+
+def peak_memory(func):
+	""" The peak of memory in bytes allocated while calling `func` or None, if tracemalloc is missing """
+	if tracemalloc is None:
+		return None
+	tracemalloc.start()
+	try:
+		func()
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+
+def measure(func, min_time=1.0, min_repeats=5, max_repeats=10000):
+	"""
+	Call `func` repeatedly until `min_time` seconds passed (but at least `min_repeats` and at most
+	`max_repeats` times) and return the results as dict. Latencies are given in microseconds.
+	"""
+	timer = timeit.default_timer
+	func() # Warm up caches (e.g. the typekey-cache of dicts)
+	latencies, total = [], 0.0
+
+	gc.collect()
+	while len(latencies) < max_repeats and (total < min_time or len(latencies) < min_repeats):
+		start = timer()
+		func()
+		latency = timer() - start
+		latencies.append(latency)
+		total += latency
+	latencies.sort()
+
+	return {
+		'ops_per_sec': len(latencies) / total,
+		'p50_us': percentile(latencies, 0.5) * 1e6,
+		'p90_us': percentile(latencies, 0.9) * 1e6,
+		'p99_us': percentile(latencies, 0.99) * 1e6,
+		'peak_memory': peak_memory(func),
+		'repeats': len(latencies),
+	}
+
+
+def run(names=None, min_time=1.0, sizes=None, report=None):
+	"""
+	Run all scenarios containing one of `names` (default: all) and return the results, a dict mapping
+	"scenario[size]" to the results of `measure`. If `sizes` is given, only sizes up to `max(sizes)` are run.
+	`report` is called with the key and the results after each scenario.
+	"""
+	results = {}
+	for name in sorted(scenarios):
+		if names and not any(part in name for part in names):
+			continue
+		func, scenario_sizes = scenarios[name]
+		for size in scenario_sizes:
+			if sizes and size > max(sizes):
+				continue
+			key = "{}[{}]".format(name, size)
+			results[key] = measure(func(size), min_time=min_time)
+			if report:
+				report(key, results[key])
+	return results
+
+
+def load_baseline(path=baseline_path):
+	""" Load the results stored with `save_baseline`. Returns an empty dict, if there is no baseline """
+	if not os.path.exists(path):
+		return {}
+	with open(path) as f:
+		return json.load(f)['results']
+
+
+def save_baseline(results, path=baseline_path):
+	""" Store the `results` of `run` as baseline. Results of scenarios not run are kept """
+	stored = load_baseline(path)
+	stored.update(results)
+	with open(path, "w") as f:
+		json.dump({"python": platform.python_version(), "results": stored}, f, indent=1, sort_keys=True, separators=(",", ": "))
+		f.write("\n")
+
+
+def compare(results, baseline, tolerance=0.2):
+	"""
+	Compare the `results` of `run` with the `baseline`. Returns a list of `(key, ratio, verdict)`, where ratio
+	is ops/sec of the result divided by the baseline and verdict one of "slower", "faster", "same" or "new".
+	Ratios within `tolerance` count as "same".
+	"""
+	comparison = []
+	for key in sorted(results):
+		if not key in baseline:
+			comparison.append((key, None, "new"))
+			continue
+		ratio = results[key]['ops_per_sec'] / baseline[key]['ops_per_sec']
+		if ratio < 1 - tolerance:
+			verdict = "slower"
+		elif ratio > 1 + tolerance:
+			verdict = "faster"
+		else:
+			verdict = "same"
+		comparison.append((key, ratio, verdict))
+	return comparison
+
+
+def format_results(key, results):
+	memory = results['peak_memory']
+	return u"{:<40} {:>12.1f} ops/s  p50 {:>12.1f}us  p90 {:>12.1f}us  p99 {:>12.1f}us  mem {:>10}".format(
+		key, results['ops_per_sec'], results['p50_us'], results['p90_us'], results['p99_us'],
+		"-" if memory is None else "{:.0f}kB".format(memory / 1024.0))
+
+
+def format_comparison(comparison):
+	lines = []
+	for key, ratio, verdict in comparison:
+		lines.append(u"{:<40} {:>8} {}".format(key, "-" if ratio is None else "{:.2f}x".format(ratio), verdict))
+	return u"\n".join(lines)
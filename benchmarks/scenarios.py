@@ -0,0 +1,128 @@
+"""
+The scenarios of the benchmarks. Each scenario is a function taking the size (e.g. the number of keys
+or elements) and returning a function without arguments, which does the measured work once. The schema
+and the data are created before, so only the validation (or construction) itself is measured.
+"""
+
+import dataschema as ds
+
+
+# name -> (function, sizes). Filled by `scenario`
+scenarios = {}
+
+
+def scenario(*sizes):
+	""" Register the decorated function as scenario, which is run once for each of `sizes` """
+	def inner(func):
+		scenarios[func.__name__] = (func, sizes)
+		return func
+	return inner
+
+
+
+@scenario(10, 1000, 100000)
+def wide_dict(size):
+	""" A flat dict with `size` value-keys """
+	schema = ds.Dict({"key{}".format(i): int for i in range(size)})
+	data = {"key{}".format(i): i for i in range(size)}
+	return lambda: schema.validate(data)
+
+
+@scenario(1000, 100000)
+def sparse_dict(size):
+	""" A dict with `size` optional value-keys, of which the data only sets a few dozen """
+	schema = ds.Dict({"key{}".format(i): ds.Int(required=False) for i in range(size)})
+	data = {"key{}".format(i): i for i in range(0, size, size // 32)}
+	return lambda: schema.validate(data)
+
+
+@scenario(10, 100)
+def deep_dict(size):
+	""" Dicts nested `size` levels deep, with a few keys on each level """
+	definition, data = {"leaf": int}, {"leaf": 1}
+	for i in range(size):
+		definition = {"child": definition, "name": ds.String(), "count": ds.Int(required=False)}
+		data = {"child": data, "name": "level{}".format(i), "count": i}
+	schema = ds.Dict(definition)
+	return lambda: schema.validate(data)
+
+
+@scenario(1000, 100000)
+def typekey_map(size):
+	""" A dict with typekeys and `size` keys of different types to match """
+	schema = ds.Dict({str: int, int: ds.String(), float: bool})
+	data = {}
+	for i in range(size):
+		if i % 3 == 0:
+			data["key{}".format(i)] = i
+		elif i % 3 == 1:
+			data[i] = "value"
+		else:
+			data[i + 0.5] = True
+	return lambda: schema.validate(data)
+
+
+@scenario(10, 100)
+def or_fanout(size):
+	""" An Or with `size` dicts as children, which are matched by their discriminator and the last one wins """
+	schema = ds.Or(*[{"type": "t{}".format(i), "value": int} for i in range(size)])
+	data = {"type": "t{}".format(size - 1), "value": 1}
+	return lambda: schema.validate(data)
+
+
+@scenario(10, 100)
+def or_fanout_undiscriminated(size):
+	""" An Or with `size` explicit values, where only the last one matches """
+	schema = ds.Or(*["value{}".format(i) for i in range(size)])
+	data = "value{}".format(size - 1)
+	return lambda: schema.validate(data)
+
+
+@scenario(1000, 100000)
+def list_of_scalars(size):
+	""" A list of `size` ints within a range """
+	schema = ds.List(ds.And(int, ds.Range(0, size)))
+	data = list(range(size))
+	return lambda: schema.validate(data)
+
+
+@scenario(1000, 100000)
+def list_of_scalars_vectorized(size):
+	""" Like `list_of_scalars`, but vectorized (see `List.vectorize`) """
+	schema = ds.List(ds.And(int, ds.Range(0, size)), vectorize=True)
+	data = list(range(size))
+	return lambda: schema.validate(data)
+
+
+@scenario(100, 10000)
+def list_of_dicts(size):
+	""" A list of `size` small records """
+	schema = ds.List({"id": int, "name": ds.String(), "active": bool, "score": ds.Float(required=False)})
+	data = [{"id": i, "name": "name{}".format(i), "active": i % 2 == 0, "score": i / 2.0} for i in range(size)]
+	return lambda: schema.validate(data)
+
+
+@scenario(1000, 10000)
+def regex_call_chain(size):
+	""" A list of `size` strings checked by Regex and converted by Call """
+	schema = ds.List(ds.And(ds.String(), ds.Regex(r"^\s*[a-z]+\d+\s*$", 0), ds.Call(lambda value: value.strip()), ds.Check(len)))
+	data = [" item{} ".format(i) for i in range(size)]
+	return lambda: schema.validate(data)
+
+
+@scenario(1000, 100000)
+def construct_wide_dict(size):
+	""" Build a Dict with `size` value-keys from its definition """
+	definition = {"key{}".format(i): int for i in range(size)}
+	return lambda: ds.Token.get_token(dict(definition))
+
+
+@scenario(10, 100)
+def construct_deep_dict(size):
+	""" Build dicts nested `size` levels deep from their definition """
+	def build():
+		definition = {"leaf": int}
+		for i in range(size):
+			definition = {"child": definition, "name": ds.String()}
+		return ds.Token.get_token(definition)
+	return build
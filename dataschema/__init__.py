@@ -1,6 +1,7 @@
-from .exceptions import SchemaError, ValidationError
+from .exceptions import SchemaError, ValidationError, Invalid, ItemError, ErrorList
 from .base import Token
-from tokens.values import *
-from tokens.container import *
-from tokens.decorator import *
-from tokens.converter import *
+from .views import DefaultsView, LazyDict, LazyList
+from .tokens.values import *
+from .tokens.container import *
+from .tokens.decorator import *
+from .tokens.converter import *
@@ -0,0 +1,133 @@
+"""
+This file contains the asynchronous validation used by `Token.avalidate`. The tokens implement
+`_acheck(values, limit)`, which returns the result like `_check` or a coroutine of it, if a coroutine
+function (e.g. given to `Call` or `Check`) has to be awaited. So the parts of a schema without
+asynchronous functions are checked as usual and coroutines are only created, where something is awaited.
+
+The children of containers with asynchronous functions below them are only checked (and their coroutines
+created) in the tasks running them, so every coroutine created is awaited right away.
+
+This file needs python 3.7 and is only imported by `avalidate` and the `_acheck` methods it calls.
+"""
+
+import asyncio
+
+from dataschema.exceptions import Invalid
+
+
+
+def is_pending(result):
+	""" True, if `result` (returned by `_acheck`) is a coroutine, which has to be awaited for the result """
+	return asyncio.iscoroutine(result)
+
+
+def then(result, callback, errback=None):
+	"""
+	Return `callback(result)`. If `result` is a coroutine, a coroutine of the return-value of the callback is
+	returned instead. If awaiting `result` raised an exception and `errback` is given, the result of
+	`errback(exception)` is used. Coroutines returned by the callbacks are awaited as well.
+	"""
+	if not is_pending(result):
+		return callback(result)
+	return _then(result, callback, errback)
+
+
+async def _then(result, callback, errback):
+	try:
+		value = await result
+	except asyncio.CancelledError:
+		raise
+	except Exception as e:
+		if errback is None:
+			raise
+		value = errback(e)
+	else:
+		value = callback(value)
+	if is_pending(value):
+		value = await value
+	return value
+
+
+def gather(checks, limit, callback):
+	"""
+	Check the (token, values) pairs `checks` with `_acheck` and call `callback` with the list of the results.
+	The tokens without asynchronous functions below them are checked right away, the others concurrently in
+	tasks. Once one returns an Invalid, the others are cancelled and left as None in the list (no task is
+	started at all, if a check failed right away). Returns the return-value of the callback or a coroutine of it.
+	"""
+	results = []
+	deferred = []
+	for token, values in checks:
+		if token._any_below('_is_async'):
+			deferred.append((len(results), token, values))
+			results.append(None)
+			continue
+		result = token._acheck(values, limit)
+		results.append(result)
+		if isinstance(result, Invalid):
+			return callback(results)
+
+	if not deferred:
+		return callback(results)
+	return _gather(results, deferred, limit, callback)
+
+
+async def _gather(results, deferred, limit, callback):
+	tasks = {asyncio.ensure_future(_acheck(token, values, limit)): index for index, token, values in deferred}
+	try:
+		while tasks:
+			done, running = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+			failed = False
+			for task in done:
+				index = tasks.pop(task)
+				results[index] = task.result()
+				failed = failed or isinstance(results[index], Invalid)
+			if failed:
+				break
+	finally:
+		for task in tasks: # Siblings of a failed check
+			task.cancel()
+		if tasks:
+			await asyncio.wait(tasks)
+		for task in tasks:
+			if not task.cancelled(): # Retrieve the exceptions of siblings failing at the same time
+				task.exception()
+
+	value = callback(results)
+	if is_pending(value):
+		value = await value
+	return value
+
+
+async def _acheck(token, values, limit):
+	""" Return the result of `token._acheck`, awaiting it if necessary """
+	result = token._acheck(values, limit)
+	if is_pending(result):
+		result = await result
+	return result
+
+
+async def call(func, values, limit=None):
+	"""
+	Await the coroutine function `func` called with `values` and return its result. With `limit` (a semaphore)
+	the function is only called, once the semaphore is acquired.
+	"""
+	if limit is None:
+		return await func(values)
+	async with limit:
+		return await func(values)
+
+
+async def call_in_thread(func, values, limit=None):
+	""" Like `call`, but run the blocking function `func` in the default executor of the running loop """
+	loop = asyncio.get_running_loop()
+	return await call(lambda values: loop.run_in_executor(None, func, values), values, limit)
+
+
+async def validate(token, values, concurrency=None):
+	""" Return the result of `token._acheck` or raise the ValidationError, if the values are invalid """
+	limit = asyncio.Semaphore(concurrency) if concurrency else None
+	result = await _acheck(token, values, limit)
+	if isinstance(result, Invalid):
+		raise result.error()
+	return result
@@ -2,11 +2,58 @@
 Contains the basic classes for all tokens.
 """
 
-from dataschema.exceptions import SchemaError, ValidationError
+import copy
 
+from dataschema.exceptions import SchemaError, ValidationError, Invalid, ItemError, ErrorList
 
-class Token(object):
-	""" Base-class for all Tokens """
+
+_missing = object()
+
+
+def _copy_mutable(result):
+	""" Return a copy of the dicts and lists in `result`, which is shared by the callers of a cache """
+	if type(result) is dict:
+		return {key: _copy_mutable(item) for key, item in result.items()}
+	if type(result) is list:
+		return [_copy_mutable(item) for item in result]
+	return result
+
+
+class _TokenType(type):
+	"""
+	The metaclass of the tokens. Subclasses may still override `_validate` instead of `_check` (e.g. to add a check
+	to Int): a class overriding `_validate`, but not `_check`, gets the `_check` of `Token`, which calls `_validate`,
+	so containers and compiled functions use the override. The methods its parent uses to check values without
+	`_check` (e.g. `_compile` inlining the checks of Int) are reset to the ones of `Token`. The `_check` inherited
+	before is kept as `_base_check`, which `Token._validate` calls for these classes, so the override may call the
+	one of its parent.
+	"""
+
+	_bypassing = ('_compile', '_collect', '_collect_steps', '_steps', '_acheck', '_merge', '_lazy', '_recheck', '_is_static', '_is_check')
+
+	def __init__(cls, name, bases, namespace):
+		super(_TokenType, cls).__init__(name, bases, namespace)
+		if '_check' in namespace:
+			cls._base_check = namespace['_check']
+		elif '_validate' in namespace:
+			cls._check = Token.__dict__['_check']
+			cls._overrides_validate = True
+			for method in _TokenType._bypassing:
+				if not method in namespace:
+					setattr(cls, method, Token.__dict__[method])
+
+
+class Token(_TokenType("_TokenBase", (object,), {"__slots__": ()})):
+	"""
+	Base-class for all Tokens
+
+	The attributes of the tokens are kept in `__slots__`. Subclasses not defining `__slots__` get an
+	instance-dict as usual, which is needed to install the wrappers of the cache or the profiler.
+	"""
+
+	__slots__ = ("_parent", "_path", "msg", "desc", "cache", "__weakref__")
+
+	_overrides_validate = False # See `_TokenType`
 
 	# this part handles the association of basic types to tokens
 	type_register = {}
@@ -43,7 +90,8 @@ class Token(object):
 			return List(definition)	
 		elif isinstance(definition, type):
 			if definition in Token.type_register: # If type is one of the associations in tokens
-				return Token.type_register[definition]()
+				token_class = Token.type_register[definition]
+				return token_class.shared() if hasattr(token_class, 'shared') else token_class()
 			else: # The type is not known
 				raise SchemaError(u"Schema can't resolve basic type `{}` to a schema-type".format(definition))
 		else: # Otherwise assume the definition should be taken "as is" and the value must match exactly
@@ -56,24 +104,119 @@ class Token(object):
 	SchemaError = SchemaError
 	ValidationError = ValidationError
 	
-	def __init__(self, msg=None, desc=None):
+	def __init__(self, msg=None, desc=None, cache=None):
 		"""
 		:param msg: A custom error message for ValidationError. If None, a default-msg is generated
 		:param desc: The description of the Token
+		:param cache: Keep the results for hashable values in a LRU-cache. Either True, the size of the
+			cache or a `dataschema.cache.Cache`, which may be shared with other tokens. Only use this, if the
+			result depends on nothing but the value (e.g. pure functions of Call). Dicts and lists within cached
+			results are copied for each caller, other objects are returned as they are
 		"""
-		self.path = ""
+		self._parent = None # The path given to set_path or a (token, key)-link to the container holding this token
+		self._path = None # The memoized path as (path of the parent, path)
 		self.msg = msg
 		self.desc = desc
+		self.cache = None
+		if cache not in (None, False):
+			self._set_cache(cache)
+
+	def _set_cache(self, cache):
+		from dataschema.cache import Cache
+		if cache is True:
+			cache = Cache()
+		elif not isinstance(cache, Cache):
+			cache = Cache(cache)
+		self.cache = cache
+		self._check = self._cached_check # Installed per instance, so tokens without cache dont pay for it
+
+	def _cached_check(self, values):
+		key = (self, values.__class__, values)
+		try:
+			result = self.cache.get(key, _missing)
+		except TypeError: # Values that cant be hashed are not cached
+			return type(self)._check(self, values)
+		if result is _missing:
+			result = type(self)._check(self, values)
+			self.cache.set(key, result)
+		if isinstance(result, Invalid): # The containers store their location on the failure, so each caller gets its own
+			return copy.copy(result)
+		return _copy_mutable(result)
+
+	def __getstate__(self):
+		state = dict(getattr(self, '__dict__', {}))
+		for cls in type(self).__mro__:
+			for name in getattr(cls, '__slots__', ()):
+				if not name in ('__dict__', '__weakref__') and hasattr(self, name):
+					state[name] = getattr(self, name)
+		state.pop('_check', None) # The wrapper of the cache is installed again by __setstate__
+		return state
+
+	def __setstate__(self, state):
+		for name, value in state.items():
+			setattr(self, name, value)
+		if self.cache is not None:
+			self._check = self._cached_check
 		
 	def set_path(self, parent_path):
 		""" This method is used to set the path for the token. The path is later on used in
 		error messages or debugging
 		"""
-		self.path = "{}{}{}".format(
+		self._parent = parent_path
+		self._path = None
+
+	def set_parent(self, parent, key=_missing):
+		"""
+		Link the token to the container `parent` holding it (with `key` for entries of dicts). The path
+		is not created now, but derived from the path of the parent, when it is needed. So building a
+		schema doesn't have to update the paths of all tokens below each new container.
+		"""
+		self._parent = (parent, key)
+		self._path = None
+
+	@property
+	def path(self):
+		""" The path of the token, created on demand from the path of the parent and memoized """
+		parent = self._parent
+		parent_path = parent[0].path if isinstance(parent, tuple) else parent
+		memo = self._path
+		if memo is None or memo[0] is not parent_path:
+			if isinstance(parent, tuple) and parent[1] is not _missing:
+				memo = self._path = (parent_path, self._format_path(u"{}:{}".format(parent_path, parent[1])))
+			else:
+				memo = self._path = (parent_path, self._format_path(parent_path))
+		return memo[1]
+
+	def path_below(self, parent, key=_missing):
+		""" Return the path of this token within the container `parent` (at `key` within dicts). Used for
+		shared tokens, which don't know their parent """
+		parent_path = parent.path
+		if key is not _missing:
+			parent_path = u"{}:{}".format(parent_path, key)
+		return self._format_path(parent_path)
+
+	def _format_path(self, parent_path):
+		""" Return the path of this token below `parent_path` """
+		return "{}{}{}".format(
 			parent_path if parent_path else "",
 			" -> " if parent_path else "",
 			self.__class__.__name__)
 	
+	def children(self):
+		""" Return the tokens directly held by this token. Containers override this """
+		return []
+
+	def walk(self):
+		""" Yield this token and all tokens below it. Tokens used in more than one place are yielded once """
+		seen, pending = set(), [self]
+		while pending:
+			token = pending.pop()
+			if id(token) in seen:
+				continue
+			seen.add(id(token))
+			yield token
+			pending.extend(reversed(token.children()))
+
 	def as_json(self, **kwargs):
 		""" Return the token-compound as a python-dict. Can be used to extract auto-docu-infos """
 		if not 'token' in kwargs:
@@ -97,12 +240,270 @@ class Token(object):
 		else:
 			return self._validate(values, default=None, has_default=False)
 
-	
+	def merge_validate(self, *layers):
+		"""
+		Validate the merge of the documents `layers` (e.g. built-in defaults, a site file, the environment and
+		command-line overrides, the last one wins) without building the merged document first. Each key of a dict
+		is taken from the highest layer setting it, dicts found in more than one layer are merged key by key and
+		each value is validated once. Other values (e.g. lists) replace the ones of lower layers. Layers and keys,
+		which are None, count as not set.
+		"""
+		layers = [layer for layer in layers if layer is not None]
+		result = self._merge(layers) if layers else self._check(None)
+		if isinstance(result, Invalid):
+			raise result.error()
+		return result
+
+	def _merge(self, layers):
+		"""
+		Like `_check`, but for the merge of the values in `layers` (lowest first, see `merge_validate`). Only dicts
+		(and the containers holding them) can be merged, other tokens check the value of the highest layer.
+		"""
+		return self._check(layers[-1])
+
+	def validate_lazy(self, values):
+		"""
+		Validate `values` like `validate`, but dicts and lists are only checked to be dicts and lists (and dicts for
+		unknown keys) and returned as the read-only views `LazyDict` and `LazyList`. Each entry is validated, once it
+		is accessed, and the result is kept, so only the parts of a large document, which are read, are validated.
+		Accessing an invalid entry raises the ValidationError. Use `force()` of the views to validate the rest and
+		get plain dicts and lists. Tokens other than Dict, List and Ref validate their whole value at once.
+		"""
+		result = self._lazy(values)
+		if isinstance(result, Invalid):
+			raise result.error()
+		return result
+
+	def _lazy(self, values):
+		""" Like `_check`, but dicts and lists return lazy views (see `validate_lazy`) """
+		return self._check(values)
+
+	def errors(self, values, max_errors=None):
+		"""
+		Validate `values`, but instead of stopping at the first failure, go on with the other entries of dicts and
+		lists and the other checks of And, and return all failures as a list of `Invalid` (with `path`, `value` and
+		`message`). The list is empty, if the values are valid. With `max_errors` the validation stops, once that
+		many failures were found.
+		"""
+		errors = ErrorList(max_errors)
+		self._collect(values, errors)
+		return errors
+
+	def avalidate(self, values, concurrency=None):
+		"""
+		Validate `values` like `validate`, but return a coroutine of the result (`await schema.avalidate(values)`
+		or `asyncio.run(schema.avalidate(values))`). `Call` and `Check` may be given coroutine functions, which are
+		awaited, and `IsPath` checks in a thread. These asynchronous checks of the entries of dicts and lists run
+		concurrently, at most `concurrency` at once (default: unlimited). Once one of them fails, the others are
+		cancelled. Needs python 3.7.
+		"""
+		from dataschema.aio import validate
+		return validate(self, values, concurrency)
+
+	def revalidate(self, previous, result, values):
+		"""
+		Validate `values`, after `previous` was validated to `result` before (e.g. a reloaded configuration).
+		Dicts and lists are walked and the results of all parts equal to `previous` are reused, so only the
+		changed parts are validated again. Unchanged parts of the result are the same objects as in `result`,
+		which must not have been modified since.
+		"""
+		checked = self._recheck(previous, result, values)
+		if isinstance(checked, Invalid):
+			raise checked.error()
+		return checked
+
+	def validate_many(self, values, on_error="raise", compiled=False):
+		"""
+		Validate each item of the iterable `values` and yield the results in order. This is a generator,
+		so items are only read and validated while the results are consumed.
+
+		:param on_error: What to do with items that dont validate:
+			"raise": Raise the ValidationError (default)
+			"yield": Yield an `ItemError` with index, value and error instead of the result
+			"skip": Leave the item out
+			callable: Called with the `ItemError`, the return-value is yielded instead of the result
+		:param compiled: If true, the token is compiled once (see `compile`) and used for all items
+		"""
+		if not (on_error in ("raise", "yield", "skip") or callable(on_error)):
+			raise ValueError(u"on_error must be 'raise', 'yield', 'skip' or a callable, not {}".format(on_error))
+		validate = self.compile() if compiled else self._validate
+		return self._validate_many(values, validate, on_error)
+
+	def _validate_many(self, values, validate, on_error):
+		for index, value in enumerate(values):
+			try:
+				yield validate(value)
+			except ValidationError as e:
+				if on_error == "raise":
+					raise
+				elif on_error == "yield":
+					yield ItemError(index, value, e)
+				elif on_error != "skip":
+					yield on_error(ItemError(index, value, e))
+
+	def validate_json_lines(self, stream, on_error="raise", compiled=False):
+		"""
+		Validate each line of the json-lines `stream` (a text- or binary-file) and yield the results, like
+		`validate_many`. The lines are read while the results are consumed.
+		"""
+		from dataschema.stream import iter_json_lines
+		return self.validate_many(iter_json_lines(stream), on_error, compiled)
+
+	def validate_parallel(self, values, workers=None, chunksize=1000, on_error="raise", compiled=False):
+		"""
+		Like `validate_many`, but the values are validated in chunks by a pool of `workers` processes
+		(default: one per cpu). The schema is pickled and send to each worker once, so functions of
+		`Call` and `Check` must either be picklable (defined at module-level) or registered with
+		`Call.register`. The results are yielded in the order of `values`. `values` are read while the results
+		are consumed, at most two chunks per worker ahead.
+		"""
+		if not (on_error in ("raise", "yield", "skip") or callable(on_error)):
+			raise ValueError(u"on_error must be 'raise', 'yield', 'skip' or a callable, not {}".format(on_error))
+		from dataschema.parallel import validate_parallel
+		return validate_parallel(self, values, workers, chunksize, on_error, compiled)
+
 	def _validate(self, values, default=None, has_default=False):
 		"""
+		Validate `values` and return the result or raise a ValidationError. This calls `_check`,
+		so each token must override either `_check` or `_validate` (see `_TokenType`).
 		"""
-		raise NotImplemented(u"validate-method must be overriden in subclasses!")
-	
+		result = self._base_check(values) if self._overrides_validate else self._check(values)
+		if isinstance(result, Invalid):
+			raise result.error()
+		return result
+
+	def _check(self, values):
+		"""
+		Like `_validate`, but returns an `Invalid` instead of raising a ValidationError. Containers call
+		this on their children, so a failing child neither has to raise nor format a message, which may
+		never be shown (e.g. within an Or). The default wraps `_validate` for tokens only implementing that.
+		"""
+		try:
+			return self._validate(values)
+		except ValidationError as e:
+			return Invalid.from_error(self, values, e)
+
+	def _collect(self, values, errors):
+		"""
+		Like `_check`, but add the failures to the ErrorList `errors` (see `errors`). A returned Invalid was already
+		added. Containers override this to go on after a failing child, until `errors` is full.
+		"""
+		result = self._check(values)
+		if isinstance(result, Invalid):
+			errors.add(result)
+		return result
+
+	def _collect_steps(self, values, errors):
+		"""
+		Like `_steps`, but for `_collect`: return a generator for `dataschema.engine.collect` or None, if `_collect`
+		can be called as usual. Containers implement their `_collect` with this.
+		"""
+		return None
+
+	def _is_check(self):
+		""" True, if this token returns the value unchanged, so an And collecting errors can go on with its next
+		tokens, after this one failed """
+		return False
+
+	def _steps(self, values):
+		"""
+		Return a generator checking `values` step by step for `dataschema.engine.run`, which yields `(token, value)`
+		for each child to check and gets its result sent back, or None, if `_check` can be called as usual.
+		Containers override this, so recursive schemas (see `Ref`) don't need a python-frame per level.
+		"""
+		return None
+
+	def _is_static(self):
+		""" True, if `_check(None)` always returns the same result, so a dict can find the result for its missing
+		keys in advance. Not the case for tokens calling user-functions """
+		return False
+
+	def _acheck(self, values, limit):
+		"""
+		Like `_check`, but may return a coroutine of the result, if an asynchronous function has to be awaited
+		(see `avalidate` and `dataschema.aio`). `limit` is the semaphore limiting the concurrent asynchronous calls
+		or None. Containers override this to check their children concurrently, the default just calls `_check`.
+		"""
+		return self._check(values)
+
+	def _is_async(self):
+		""" True, if `_acheck` of this token (not counting its children) awaits something """
+		return False
+
+	def _prefetch(self, values):
+		"""
+		Called by containers with all `values` this token is about to check (e.g. the elements of a list), before
+		they are checked one by one. Tokens doing slow lookups (like IsPath) do them at once here.
+		"""
+		pass
+
+	def _is_batched(self):
+		""" True, if `_prefetch` of this token (not counting its children) does something """
+		return False
+
+	def _any_below(self, flag):
+		""" True, if the method named `flag` (e.g. "_is_async") returns true for this token or a token below it """
+		return getattr(self, flag)()
+
+	def _recheck(self, previous, result, values):
+		"""
+		Like `_check`, but `previous` was already validated to `result`. Containers override this to
+		only check the changed parts, other tokens reuse the result, if the value is equal.
+		"""
+		if values is previous:
+			return result
+		elif values.__class__ is previous.__class__:
+			from dataschema.vector import is_buffer, buffers_equal
+			if is_buffer(values):
+				equal = buffers_equal(values, previous)
+			else:
+				try:
+					equal = bool(values == previous)
+				except (TypeError, ValueError): # == doesn't return a truth value (e.g. compared elementwise)
+					equal = False
+			if equal:
+				return result
+		return self._check(values)
+
+	def profile(self):
+		"""
+		Return a `dataschema.profiling.Profiler` for this token and all tokens below it. While enabled (e.g. within
+		a with-statement), calls, time and failures of each token are recorded by its path.
+		"""
+		from dataschema.profiling import Profiler
+		return Profiler(self)
+
+	def reloader(self, paths, parse=None, interval=1.0, on_error=None):
+		"""
+		Return a `dataschema.reload.Reloader`, which keeps the validated content of the file or files `paths` in
+		its `value`. While started (e.g. within a with-statement), the files are polled every `interval` seconds
+		and only parsed (with `parse`, default json) and validated again, once their content changed.
+		"""
+		from dataschema.reload import Reloader
+		return Reloader(self, paths, parse, interval, on_error)
+
+	def compile(self):
+		"""
+		Compile the token-tree into one specialised function. The returned function takes the
+		value to validate and returns the same results and raises the same errors as `validate`,
+		but without the overhead of calling `_validate` for each token. The paths of the tokens
+		are taken as they are, so compile the outermost token, after the schema is complete.
+		"""
+		from dataschema.compiler import Compiler
+		return Compiler().compile(self)
+
+	def _compile(self, compiler, source, target):
+		"""
+		Emit the code to validate the variable named `source` and store the result
+		in the variable `target` (See `dataschema.compiler.Compiler`). This default just calls
+		`_check`, so tokens with simple checks override this to inline them. Subclasses
+		changing `_check` must also override this, if the parent inlines its checks.
+		"""
+		compiler.emit("{} = {}._check({})".format(target, compiler.const(self), source))
+		compiler.emit("if isinstance({}, Invalid):".format(target))
+		with compiler.block():
+			compiler.fail(self, source, target)
+
 	def __add__(self, other):
 		""" This is used to merge to Schemas. Each Token (or base-class) must override
 		this method, if it is merge-able. 
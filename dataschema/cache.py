@@ -0,0 +1,74 @@
+"""
+This file contains the LRU-cache used by tokens created with `cache=`. The cache
+keeps the results of `_check` for hashable values, so the same work is not done
+again for values that repeat.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+_clock = getattr(time, 'monotonic', time.time) # Python 2 has no monotonic clock
+
+
+
+class Cache(object):
+	"""
+	A bounded cache, which drops the least recently used entry, if more than `size` entries are stored.
+	With `ttl` entries expire that many seconds after they were set (e.g. for results depending on the
+	filesystem). `hits` and `misses` count the lookups. One cache may be shared by multiple tokens, the
+	entries are kept seperate per token.
+	"""
+
+	def __init__(self, size=1024, ttl=None):
+		self.size = size
+		self.ttl = ttl
+		self.hits = 0
+		self.misses = 0
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key, default=None):
+		""" Return the entry for `key` or `default`. Raises a TypeError, if `key` is not hashable """
+		with self._lock:
+			try:
+				value = self._entries.pop(key)
+			except KeyError:
+				self.misses += 1
+				return default
+			if self.ttl is not None:
+				value, expires = value
+				if expires < _clock():
+					self.misses += 1
+					return default
+				self._entries[key] = (value, expires)
+			else:
+				self._entries[key] = value # Moves the key to the end, as the most recently used
+			self.hits += 1
+			return value
+
+	def set(self, key, value):
+		with self._lock:
+			self._entries.pop(key, None)
+			self._entries[key] = value if self.ttl is None else (value, _clock() + self.ttl)
+			if len(self._entries) > self.size:
+				self._entries.popitem(last=False)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self.hits = self.misses = 0
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __getstate__(self):
+		# Only the settings are pickled, the entries are filled again on the other side
+		return {'size': self.size, 'ttl': self.ttl}
+
+	def __setstate__(self, state):
+		self.__init__(state['size'], state.get('ttl'))
+
+	def __repr__(self):
+		return u"<Cache size={} ttl={} entries={} hits={} misses={}>".format(self.size, self.ttl, len(self), self.hits, self.misses)
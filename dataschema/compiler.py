@@ -0,0 +1,146 @@
+"""
+This file contains the compiler, which turns a token-tree into one specialised
+python-function. Instead of calling `_validate` on each token, the tokens emit
+python-source for their checks (see `Token._compile`) and the compiler glues
+everything together into a single function.
+"""
+
+from dataschema.base import _missing
+from dataschema.exceptions import ValidationError, Invalid
+
+
+
+def _error(failure, parent, key):
+	""" Return the ValidationError for the Invalid `failure` of a token compiled within the container `parent`
+	(at `key` within dicts), which is added to the failure, so shared tokens get their full path """
+	if parent is not None:
+		failure = parent._locate(failure) if key is _missing else parent._locate(failure, key)
+	return failure.error()
+
+
+
+class Compiler(object):
+	"""
+	Collects the source emitted by the tokens. Each token gets the name of the variable
+	holding its input and the name of the variable the result should be stored in. Every
+	object the generated code needs (types, tokens, defaults, ...) is stored in the namespace
+	of the generated module and only referenced by name.
+
+	Containers nested deeper than `max_level` are moved into their own function, because python
+	limits the number of nested blocks.
+	"""
+
+	max_level = 15
+
+	# Constants of these types are written directly into the source
+	literal_types = (type(None), bool, int, str, type(u""))
+
+	def __init__(self):
+		self.namespace = {'ValidationError': ValidationError, 'Invalid': Invalid, '_error': _error}
+		self.constants = {}
+		self.functions = []
+		self.definitions = []
+		self.lines = None
+		self.level = 0
+		self.counter = 0
+		self.quiet = 0
+		self.locations = [] # (container, key) of the tokens being compiled
+
+	def compile(self, token):
+		"""
+		Compile `token` and return the generated function. The function takes the value to validate
+		and returns the validated value, just like `token.validate`
+		"""
+		name = self.function(token)
+		source = "\n\n".join(["\n".join(lines) for lines in self.functions] + self.definitions)
+		exec(compile(source, u"<dataschema {}>".format(token.path), "exec"), self.namespace)
+
+		func = self.namespace[name]
+		func.source = source
+		return func
+
+
+	# ----------------------------------------------------------------------------------------
+	# Helpers used by the tokens in `_compile`
+
+	def name(self, prefix):
+		""" Return a new unique variable-name """
+		self.counter += 1
+		return "{}{}".format(prefix, self.counter)
+
+	def const(self, obj):
+		""" Return an expression for `obj` usable within the generated code """
+		if type(obj) in self.literal_types:
+			return repr(obj)
+		if not id(obj) in self.constants:
+			name = self.name("_c")
+			self.constants[id(obj)] = name
+			self.namespace[name] = obj
+		return self.constants[id(obj)]
+
+	def define(self, prefix, source):
+		""" Emit a module-level variable with the expression `source` and return its name. The variables
+		are defined after all functions, so they may refer to them """
+		name = self.name(prefix)
+		self.definitions.append("{} = {}".format(name, source))
+		return name
+
+	def emit(self, line):
+		self.lines.append("\t" * self.level + line)
+
+	def block(self):
+		""" Use with the with-statement to indent all lines emitted within """
+		return _Block(self)
+
+	def fail(self, token, source, failure=None):
+		"""
+		Emit the code to raise the error of `token` for the value in `source`. Within an Or the message is never
+		shown, so we dont bother to create one. Otherwise the error is created from `failure` (an expression for
+		the Invalid) or by checking the value with `token` again. Tokens only call this without `failure` for their
+		own checks (e.g. of the type), so no children or functions are called twice. The location of the token is
+		added to the failure, so shared tokens get the same path as without compiling.
+		"""
+		if self.quiet:
+			self.emit("raise ValidationError(None)")
+			return
+		if failure is None:
+			failure = "{}._check({})".format(self.const(token), source)
+		parent, key = self.locations[-1] if self.locations else (None, _missing)
+		self.emit("raise _error({}, {}, {})".format(failure, self.const(parent), self.const(key)))
+
+	def inline(self, token, source, parent=None, key=_missing):
+		"""
+		Emit the code for `token` held by the container `parent` (at `key` within dicts) and return the name of the
+		variable holding the result
+		"""
+		target = self.name("r")
+		if self.level >= self.max_level:
+			self.emit("{} = {}({})".format(target, self.function(token, parent, key), source))
+		else:
+			self.locations.append((parent, key))
+			token._compile(self, source, target)
+			self.locations.pop()
+		return target
+
+	def function(self, token, parent=None, key=_missing):
+		""" Emit a new function validating `token` (held by `parent`, see `inline`) and return its name """
+		name = self.name("validate")
+		outer = self.lines, self.level
+		self.lines, self.level = ["def {}(value):".format(name)], 1
+		self.emit("return {}".format(self.inline(token, "value", parent, key)))
+		self.functions.append(self.lines)
+		self.lines, self.level = outer
+		return name
+
+
+
+class _Block(object):
+
+	def __init__(self, compiler):
+		self.compiler = compiler
+
+	def __enter__(self):
+		self.compiler.level += 1
+
+	def __exit__(self, *args):
+		self.compiler.level -= 1
@@ -0,0 +1,67 @@
+"""
+This file contains the iterative validation used for recursive schemas (see `Ref`). Instead of calling
+`_check` of their children, the containers return a generator from `_steps`, which yields `(token, value)`
+for each child to check and gets the result sent back. The generators are kept on an explicit stack,
+so the depth of the data is not limited by the recursion limit of python. `Token.errors` works the same
+way with the generators of `_collect_steps`.
+
+The last item of each generator is a `Done` with the result of the container. Python 2 doesn't allow
+generators to return a value, so the result is yielded instead.
+"""
+
+
+
+class Done(object):
+	""" The last item yielded by the generators of `_steps`, holding the result """
+	__slots__ = ("result",)
+
+	def __init__(self, result):
+		self.result = result
+
+
+def run(token, values):
+	""" Return the result of `token._check(values)`, but check the children of containers with an explicit stack """
+	steps = token._steps(values)
+	if steps is None:
+		return token._check(values)
+
+	stack, result = [steps], None
+	while stack:
+		step = stack[-1].send(result)
+		if step.__class__ is Done:
+			stack.pop()
+			result = step.result
+			continue
+
+		token, values = step
+		steps = token._steps(values)
+		if steps is None: # Tokens without containers below are checked as usual
+			result = token._check(values)
+		else:
+			stack.append(steps)
+			result = None # New generators must be started with None
+	return result
+
+
+def collect(token, values, errors):
+	""" Like `run`, but return the result of `token._collect(values, errors)` using `_collect_steps` (see `Token.errors`) """
+	steps = token._collect_steps(values, errors)
+	if steps is None:
+		return token._collect(values, errors)
+
+	stack, result = [steps], None
+	while stack:
+		step = stack[-1].send(result)
+		if step.__class__ is Done:
+			stack.pop()
+			result = step.result
+			continue
+
+		token, values = step
+		steps = token._collect_steps(values, errors)
+		if steps is None:
+			result = token._collect(values, errors)
+		else:
+			stack.append(steps)
+			result = None
+	return result
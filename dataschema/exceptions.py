@@ -6,7 +6,7 @@ class SchemaError(Exception):
     This is raised, if the schema is not valid and couldnt be compiled
     """
     def __init__(self, msg):
-        super(SchemaError, self).__init__()
+        super(SchemaError, self).__init__(msg)
         self.message = msg
 
     def __str__(self):
@@ -21,7 +21,7 @@ class ValidationError(Exception):
     This is raised, if there was an error during the validation 
     """
     def __init__(self, msg):
-        super(ValidationError, self).__init__()
+        super(ValidationError, self).__init__(msg)
         self.message = msg
 
     def __repr__(self):
@@ -31,4 +31,91 @@ class ValidationError(Exception):
         return self.message
     
     def __unicode__(self):
-        return self.message
\ No newline at end of file
+        return self.message
+
+
+class Invalid(object):
+    """
+    Returned by `Token._check` instead of raising a ValidationError. It only keeps a reference
+    to the failing token, the value and the arguments for the message. The message itself is only
+    created, if the failure gets reported (`message` or `error()`), so failures that are dropped
+    anyway (e.g. within an Or) are cheap.
+
+    `template` is formatted with the path of the token followed by `args`, unless the token
+    has a custom message.
+
+    Shared tokens (see `ValueToken.shared`) don't know where they are used, so the container receiving
+    the failure stores itself (and the key within dicts) as `parent`, and the path is created from it.
+    """
+    def __init__(self, token, value, template, *args):
+        self.token = token
+        self.value = value
+        self.template = template
+        self.args = args
+        self.msg = token.msg
+        self.parent = None # (container,) or (container, key)
+
+    @classmethod
+    def from_error(cls, token, value, error):
+        """ Wrap an already raised ValidationError and keep its message as is """
+        failure = cls(token, value, u"{1}", error.message)
+        failure.msg = None
+        return failure
+
+    @property
+    def path(self):
+        if self.parent is None:
+            return self.token.path
+        return self.token.path_below(*self.parent)
+
+    @property
+    def message(self):
+        return self.msg or self.template.format(self.path, *self.args)
+
+    def error(self):
+        return ValidationError(self.message)
+
+    def __str__(self):
+        return self.message
+
+    def __unicode__(self):
+        return self.message
+
+    def __repr__(self):
+        return u"<Invalid path='{}'>".format(self.path)
+
+
+class ItemError(object):
+    """
+    Describes an item of `Token.validate_many`, that did not validate
+    """
+    def __init__(self, index, value, error):
+        self.index = index
+        self.value = value
+        self.error = error
+
+    @property
+    def message(self):
+        return self.error.message
+
+    def __repr__(self):
+        return u"<ItemError index={} message='{}'>".format(self.index, self.message)
+
+
+class ErrorList(list):
+    """
+    The failures (`Invalid`) found by `Token.errors`. Once `max_errors` failures were added,
+    `full` is true and the containers stop checking further entries.
+    """
+    def __init__(self, max_errors=None):
+        super(ErrorList, self).__init__()
+        self.max_errors = max_errors
+
+    @property
+    def full(self):
+        return self.max_errors is not None and len(self) >= self.max_errors
+
+    def add(self, failure):
+        """ Add the Invalid `failure` and return it """
+        self.append(failure)
+        return failure
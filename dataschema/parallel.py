@@ -0,0 +1,115 @@
+"""
+This file contains the process-pool based validation used by `Token.validate_parallel`.
+The schema is pickled once and handed to each worker when it starts, afterwards only
+the chunks of values and their results are send between the processes.
+"""
+
+from collections import deque
+from itertools import islice
+import multiprocessing
+import pickle
+import threading
+
+from dataschema.exceptions import SchemaError, ValidationError, ItemError
+
+
+# The validate-function of the schema within a worker, set by `_init_worker`
+_validate = None
+
+# The number of chunks per worker read ahead of the results consumed
+chunks_per_worker = 2
+
+
+def _init_worker(schema, compiled):
+	global _validate
+	try:
+		token = pickle.loads(schema)
+		_validate = token.compile() if compiled else token._validate
+	except SchemaError as e:
+		# A failing initializer just gets restarted by the pool, so report it with the first chunk
+		_validate = _Broken(e.message)
+
+
+class _Broken(object):
+
+	def __init__(self, message):
+		self.message = message
+
+	def __call__(self, value):
+		raise SchemaError(self.message)
+
+
+def _validate_chunk(chunk):
+	"""
+	Validate all values of `chunk` within the worker. Returns the results and the messages of the
+	failed values by their offset. Only the message is send back, the values are still known in
+	the main process.
+	"""
+	results, failures = [], {}
+	for offset, value in enumerate(chunk):
+		try:
+			results.append(_validate(value))
+		except ValidationError as e:
+			results.append(None)
+			failures[offset] = e.message
+	return results, failures
+
+
+def _chunks(values, chunksize):
+	values = iter(values)
+	while True:
+		chunk = list(islice(values, chunksize))
+		if not chunk:
+			return
+		yield chunk
+
+
+def validate_parallel(token, values, workers=None, chunksize=1000, on_error="raise", compiled=False):
+	""" See `Token.validate_parallel` """
+	try:
+		schema = pickle.dumps(token, pickle.HIGHEST_PROTOCOL)
+	except (pickle.PicklingError, TypeError, AttributeError) as e:
+		raise SchemaError(u"Schema {} can't be pickled to send it to the workers: {}. Functions of Call or Check may "
+				u"have to be registered with Call.register".format(token.path, e))
+	return _validate_parallel(schema, values, workers, chunksize, on_error, compiled)
+
+
+def _validate_parallel(schema, values, workers, chunksize, on_error, compiled):
+	# The chunks are kept, so the failing values can be passed to ItemError. The pool feeds the chunks from
+	# another thread, but always in order, so the first pending chunk belongs to the next result. The pool
+	# would read all values at once, so the thread waits, once `chunks_per_worker` chunks per worker are pending
+	pending = deque()
+	in_flight = threading.Semaphore(chunks_per_worker * (workers or multiprocessing.cpu_count()))
+	stopped = threading.Event()
+	def feed():
+		chunks = _chunks(values, chunksize)
+		while True:
+			in_flight.acquire()
+			chunk = None if stopped.is_set() else next(chunks, None)
+			if chunk is None:
+				return
+			pending.append(chunk)
+			yield chunk
+
+	pool = multiprocessing.Pool(workers, _init_worker, (schema, compiled))
+	try:
+		index = 0
+		for results, failures in pool.imap(_validate_chunk, feed()):
+			chunk = pending.popleft()
+			in_flight.release()
+			for offset, result in enumerate(results):
+				if not offset in failures:
+					yield result
+				elif on_error == "raise":
+					raise ValidationError(failures[offset])
+				elif on_error == "yield":
+					yield ItemError(index + offset, chunk[offset], ValidationError(failures[offset]))
+				elif on_error != "skip":
+					yield on_error(ItemError(index + offset, chunk[offset], ValidationError(failures[offset])))
+			index += len(chunk)
+		pool.close()
+	finally:
+		stopped.set() # The results are not consumed anymore, so let the feeding thread end
+		in_flight.release()
+		pool.terminate()
+		pool.join()
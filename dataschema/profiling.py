@@ -0,0 +1,200 @@
+"""
+This file contains the profiler, which measures the tokens of a schema while validating. It wraps
+`_check` of each token in the tree, while it is enabled, and records the number of calls, the time
+spent within the token (cumulative and without its children) and the number of failures by the path
+of the token. Once disabled, the wrappers are removed again, so tokens not being profiled pay nothing.
+
+Value tokens keep their attributes in `__slots__` (see `ValueToken`), so there is no place for a wrapper
+on the instance. For them `_check` of the class is replaced by a dispatcher while profiled, which calls the
+wrapper registered for the token in `_hooks` or the original method for all other tokens of the class.
+"""
+
+from collections import OrderedDict
+import timeit
+
+from dataschema.exceptions import Invalid
+
+
+
+class TokenStats(object):
+	""" The measurements of one token. Times are given in seconds """
+
+	def __init__(self, path):
+		self.path = path
+		self.calls = 0
+		self.failures = 0
+		self.cumulative = 0.0
+		self.own = 0.0 # Without the time spent in children
+
+	def as_dict(self):
+		return {'calls': self.calls, 'failures': self.failures, 'cumulative': self.cumulative, 'self': self.own}
+
+	def __repr__(self):
+		return u"<TokenStats path='{}' calls={} failures={}>".format(self.path, self.calls, self.failures)
+
+
+
+class Profiler(object):
+	"""
+	Profile the validation of `token` and all tokens below it. Use it with the with-statement or call
+	`enable` and `disable`:
+
+		with Profiler(schema) as profile:
+			schema.validate(data)
+		print(profile.table())
+
+	Only `_check` is measured, so compiled functions (see `Token.compile`) are not profiled. Value tokens
+	shared within a schema (see `ValueToken.shared`) are counted by the path of the container calling them.
+	The profiler expects the schema to be used by one thread at a time while enabled.
+	"""
+
+	def __init__(self, token):
+		self.token = token
+		self.stats = OrderedDict() # path -> TokenStats
+		self.stacks = {} # The paths of the tokens on the stack joined with ";" -> seconds spent in the innermost token
+		self._installed = [] # (token, previous _check of the instance or None, True if hooked into the class)
+		self._stack = [] # One entry per active token: [frames, path, time spent in children, token]
+
+	def enable(self):
+		if self._installed:
+			return
+		for token in self.token.walk():
+			if not hasattr(token, '__dict__'): # No place for the wrapper, so the class dispatches to it
+				previous = _hooks.get(id(token))
+				check = previous or _original_check(token.__class__).__get__(token, token.__class__)
+				_hook_class(token.__class__)
+				_hooks[id(token)] = self._wrap(token, check)
+				self._installed.append((token, previous, True))
+				continue
+			previous = token.__dict__.get('_check')
+			self._installed.append((token, previous, False))
+			token._check = self._wrap(token, token._check)
+
+	def disable(self):
+		for token, previous, hooked in reversed(self._installed):
+			if hooked:
+				if previous is None:
+					del _hooks[id(token)]
+				else:
+					_hooks[id(token)] = previous
+				_unhook_class(token.__class__)
+			elif previous is None:
+				del token._check
+			else:
+				token._check = previous
+		self._installed = []
+
+	def __enter__(self):
+		self.enable()
+		return self
+
+	def __exit__(self, *args):
+		self.disable()
+
+	def _wrap(self, token, check):
+		shared = getattr(token, '_shared', False)
+		fixed = None if shared else self.stats.setdefault(token.path, TokenStats(token.path))
+		stack, stacks, timer = self._stack, self.stacks, timeit.default_timer
+
+		def profiled(values):
+			if stack and stack[-1][3] is token: # Called again by itself (see `ContainerToken._check_prefetched`)
+				return check(values)
+			if shared: # The path depends on the container calling the token
+				path = token._format_path(stack[-1][1]) if stack else token.path
+				stats = self.stats.get(path) or self.stats.setdefault(path, TokenStats(path))
+			else:
+				path, stats = token.path, fixed
+			if stack:
+				frames = u"{};{}".format(stack[-1][0], _frame(path, stack[-1][1]))
+			else:
+				frames = _frame(path, u"")
+			entry = [frames, path, 0.0, token]
+			stack.append(entry)
+			start = timer()
+			try:
+				result = check(values)
+			finally:
+				elapsed = timer() - start
+				stack.pop()
+				if stack:
+					stack[-1][2] += elapsed
+				stats.calls += 1
+				stats.cumulative += elapsed
+				stats.own += elapsed - entry[2]
+				stacks[frames] = stacks.get(frames, 0.0) + elapsed - entry[2]
+			if isinstance(result, Invalid):
+				stats.failures += 1
+			return result
+		return profiled
+
+
+	# ----------------------------------------------------------------------------------------
+	# Reports
+
+	def as_dict(self):
+		""" Return the measurements as dict mapping the paths to dicts with calls, failures, cumulative and self """
+		return OrderedDict((path, stats.as_dict()) for path, stats in self.stats.items() if stats.calls)
+
+	def table(self, sort="self", limit=None):
+		""" Return the measurements as text-table sorted by `sort` (one of the keys of `as_dict`) """
+		rows = sorted(self.as_dict().items(), key=lambda item: -item[1][sort])[:limit]
+		lines = [u"{:>10} {:>10} {:>12} {:>12}  {}".format("calls", "failures", "cumulative", "self", "path")]
+		for path, stats in rows:
+			lines.append(u"{:>10} {:>10} {:>11.6f}s {:>11.6f}s  {}".format(
+				stats['calls'], stats['failures'], stats['cumulative'], stats['self'], path))
+		return u"\n".join(lines)
+
+	def collapsed(self):
+		""" Return the measurements as collapsed stacks (one line of frames and microseconds per stack),
+		which can be turned into a flamegraph (e.g. with flamegraph.pl) """
+		return u"\n".join(u"{} {}".format(frames, int(round(seconds * 1e6))) for frames, seconds in sorted(self.stacks.items()))
+
+
+
+_hooks = {} # id(token) -> the wrapper of the profiler for tokens without instance dict
+_hooked = {} # class -> number of tokens profiled through the dispatcher of the class
+
+
+
+def _original_check(cls):
+	""" Return `_check` of `cls` without the dispatchers installed by `_hook_class` """
+	check = cls.__dict__.get('_check') or getattr(cls, '_check')
+	check = getattr(check, '__func__', check)
+	return getattr(check, '_original', check)
+
+
+def _hook_class(cls):
+	""" Replace `_check` of `cls` by a dispatcher calling the wrappers in `_hooks` """
+	if cls in _hooked:
+		_hooked[cls] += 1
+		return
+	original = _original_check(cls)
+	def _check(self, values):
+		profiled = _hooks.get(id(self))
+		if profiled is None:
+			return original(self, values)
+		return profiled(values)
+	_check._original = original
+	_check._defined = '_check' in cls.__dict__
+	cls._check = _check
+	_hooked[cls] = 1
+
+
+def _unhook_class(cls):
+	_hooked[cls] -= 1
+	if _hooked[cls]:
+		return
+	del _hooked[cls]
+	dispatcher = cls.__dict__['_check']
+	if dispatcher._defined:
+		cls._check = dispatcher._original
+	else:
+		del cls._check
+
+
+
+def _frame(path, parent_path):
+	""" The name of the token with `path` in a collapsed stack: its path relative to the path of its parent """
+	if parent_path and path.startswith(parent_path):
+		path = path[len(parent_path):].lstrip(u" ->:") or path
+	return path.replace(u";", u",")
@@ -0,0 +1,143 @@
+"""
+This file contains the reloader used by `Token.reloader`. It polls a few files (e.g. the layers of a
+configuration) in a background thread and keeps the validated result of their content up to date. Each
+poll only stats the files. A file is only read, if its stat changed, and only parsed and validated again,
+if the hash of its content changed, so touching or rewriting a file with the same content is cheap.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+
+_unchecked = object() # The signature and digest of files not looked at yet
+
+
+
+class _File(object):
+	""" The state of one watched file: its stat, the hash of its content and the parsed document """
+
+	def __init__(self, path):
+		self.path = path
+		self.signature = _unchecked # (inode, size, mtime) or None, if the file is missing
+		self.digest = _unchecked
+		self.document = None
+		self.error = None # The exception raised by parse for the current content
+
+	def refresh(self, parse):
+		""" Read and parse the file again, if it changed. Returns True, if the content changed or wasn't read before """
+		try:
+			stat = os.stat(self.path)
+		except OSError:
+			stat = None
+		signature = None if stat is None else (stat.st_ino, stat.st_size, getattr(stat, 'st_mtime_ns', stat.st_mtime))
+		if signature == self.signature:
+			return False
+		self.signature = signature
+
+		content = None
+		if stat is not None:
+			try:
+				with open(self.path, "rb") as f:
+					content = f.read()
+			except (IOError, OSError): # Removed since
+				pass
+		digest = None if content is None else hashlib.sha1(content).digest()
+		if digest == self.digest:
+			return False
+		self.digest = digest
+
+		try:
+			self.document, self.error = None if content is None else parse(content), None
+		except Exception as e:
+			self.document, self.error = None, e
+		return True
+
+
+
+class Reloader(object):
+	"""
+	Keep the result of validating the files `paths` with `token` in `value`. With more than one file,
+	the documents are merged like the layers of `Token.merge_validate` (the last one wins), missing files
+	are left out. `parse` turns the content (bytes) of a file into a document (default: json).
+
+		reloader = schema.reloader(["defaults.json", "/etc/app.json"], interval=5)
+		with reloader: # Polls in a background thread
+			serve(lambda: reloader.value)
+
+	The files are loaded once by the constructor, which raises the errors. `value` is replaced by the new
+	result as a whole, so readers get either the old or the new result, but never a mix of both. Results
+	must not be modified by readers. If a changed file can't be parsed or validated, the previous value is
+	kept and the error is stored in `error` and passed to `on_error`.
+	"""
+
+	def __init__(self, token, paths, parse=None, interval=1.0, on_error=None):
+		if isinstance(paths, (str, type(u""))):
+			paths = [paths]
+		self.token = token
+		self.parse = json.loads if parse is None else parse
+		self.interval = interval
+		self.on_error = on_error
+		self.value = None
+		self.error = None
+		self._files = [_File(path) for path in paths]
+		self._lock = threading.Lock()
+		self._stopped = threading.Event()
+		self._thread = None
+		self.check()
+
+	def check(self):
+		"""
+		Look for changes of the files and validate them again, if the content of one changed. Returns True,
+		if `value` was replaced. Errors of the changed files are stored in `error` and raised.
+		"""
+		with self._lock:
+			changed = [watched.refresh(self.parse) for watched in self._files]
+			if not any(changed):
+				return False
+			try:
+				for watched in self._files:
+					if watched.error is not None:
+						raise watched.error
+				value = self.token.merge_validate(*[watched.document for watched in self._files])
+			except Exception as e:
+				self.error = e
+				raise
+			self.value, self.error = value, None
+			return True
+
+	def start(self):
+		""" Start polling the files every `interval` seconds in a background thread """
+		if self._thread is not None:
+			return
+		self._stopped.clear()
+		self._thread = threading.Thread(target=self._poll, name="dataschema-reloader")
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		""" Stop the thread started by `start` and wait for it """
+		if self._thread is None:
+			return
+		self._stopped.set()
+		self._thread.join()
+		self._thread = None
+
+	def _poll(self):
+		while not self._stopped.wait(self.interval):
+			try:
+				self.check()
+			except Exception as e:
+				if self.on_error is not None:
+					self.on_error(e)
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *args):
+		self.stop()
+
+	def __repr__(self):
+		return u"<Reloader paths={}>".format([watched.path for watched in self._files])
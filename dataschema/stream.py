@@ -0,0 +1,151 @@
+"""
+This file contains parsers, which read json-documents incrementally from a stream. They are used by
+`List.validate_json_array` and `Token.validate_json_lines` to validate huge documents one element at
+a time, so only one element has to be in memory and not the whole document.
+"""
+
+import codecs
+import json
+import json.scanner
+import re
+
+
+_whitespace = u" \t\n\r"
+
+# A number ending with one of these might go on in the next read
+_number = u"0123456789.eE+-"
+
+
+# Values cut off by the end of the buffer are reported up to this many characters before the end (e.g. `-Infinity`)
+_max_cut = 10
+
+_char = re.compile(r"\(char (\d+)")
+
+
+def _error_position(error):
+	""" Return the position in the text, where decoding failed with the ValueError `error`, or None """
+	position = getattr(error, 'pos', None)
+	if position is None: # Only part of the message before python 3.5
+		match = _char.search(str(error))
+		position = None if match is None else int(match.group(1))
+	return position
+
+
+def _is_invalid(error, text, start):
+	"""
+	Return True, if the ValueError `error` raised for decoding the value at `start` of `text` is not caused by
+	the end of `text`, so reading more can't help. The decoder reports where it failed, which is before the
+	end for invalid values. Values cut off by the end are reported at most `_max_cut` characters before the end,
+	except unterminated strings, which are reported where they start.
+	"""
+	message, position = str(error), _error_position(error)
+	if position is None: # The scanner written in C of python 2 drops the position, the one in python doesn't
+		decoder = json.JSONDecoder()
+		decoder.scan_once = json.scanner.py_make_scanner(decoder)
+		try:
+			decoder.raw_decode(text, start)
+		except ValueError as e:
+			message, position = str(e), _error_position(e)
+		if position is None: # The value at start itself is invalid
+			position = start
+	return position < len(text) - _max_cut and not u"Unterminated string" in message
+
+
+
+class _Buffer(object):
+	"""
+	Holds the part of the stream read but not yet parsed. Byte-streams are decoded incrementally,
+	so multi-byte characters split by a read are handled.
+	"""
+
+	def __init__(self, stream, chunksize):
+		self.stream = stream
+		self.chunksize = chunksize
+		self.decoder = codecs.getincrementaldecoder("utf-8")()
+		self.text = u""
+		self.pos = 0
+		self.eof = False
+
+	def read(self, size=None):
+		""" Read more from the stream and drop everything already parsed. Returns False at the end of the stream """
+		if self.eof:
+			return False
+		chunk = self.stream.read(size or self.chunksize)
+		self.eof = not chunk
+		if isinstance(chunk, bytes) and not isinstance(chunk, type(u"")):
+			chunk = self.decoder.decode(chunk, final=self.eof)
+		self.text = self.text[self.pos:] + chunk
+		self.pos = 0
+		return not self.eof
+
+	def skip_whitespace(self):
+		""" Skip whitespace and return the next character or None at the end of the stream """
+		while True:
+			while self.pos < len(self.text) and self.text[self.pos] in _whitespace:
+				self.pos += 1
+			if self.pos < len(self.text):
+				return self.text[self.pos]
+			if not self.read():
+				return None
+
+	def expect(self, characters):
+		character = self.skip_whitespace()
+		if character is None or not character in characters:
+			raise ValueError(u"Expected one of `{}` but found `{}` in json-stream".format(characters, character))
+		self.pos += 1
+		return character
+
+	def decode(self, decoder):
+		"""
+		Decode the next value. If the value can't be decoded or ends where the buffer ends (a number may
+		go on in the next read), more is read. Each read takes at least as much as already buffered, so
+		large values only get parsed a few times.
+		"""
+		while True:
+			try:
+				value, end = decoder.raw_decode(self.text, self.pos)
+			except ValueError as e:
+				if _is_invalid(e, self.text, self.pos) or not self.read(max(self.chunksize, len(self.text))):
+					raise
+				continue
+			if end < len(self.text) and not self.text[end] in _number:
+				self.pos = end
+				return value
+
+			start = self.pos
+			if not self.read(max(self.chunksize, len(self.text))): # read drops the text before start
+				self.pos = end - start
+				return value
+
+
+
+def iter_json_array(stream, chunksize=65536):
+	"""
+	Yield the elements of the json-array in `stream` (a text- or binary-file) one after another.
+	Only the current element and one chunk of the stream are kept in memory.
+	"""
+	buffer = _Buffer(stream, chunksize)
+	decoder = json.JSONDecoder()
+
+	buffer.expect(u"[")
+	if buffer.skip_whitespace() == u"]":
+		buffer.pos += 1
+		return
+	while True:
+		buffer.skip_whitespace()
+		yield buffer.decode(decoder)
+		if buffer.expect(u",]") == u"]":
+			return
+
+
+def iter_json_lines(stream):
+	""" Yield the decoded documents of a json-lines stream. Empty lines are skipped """
+	for number, line in enumerate(stream, 1):
+		if isinstance(line, bytes) and not isinstance(line, type(u"")):
+			line = line.decode("utf-8")
+		if not line.strip():
+			continue
+		try:
+			yield json.loads(line)
+		except ValueError as e:
+			raise ValueError(u"Line {} of json-lines stream is invalid: {}".format(number, e))
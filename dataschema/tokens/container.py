@@ -1,12 +1,26 @@
 
 
 from collections import OrderedDict
+import inspect
+import threading
 
-from dataschema.base import Token
-from dataschema.exceptions import SchemaError, ValidationError
+from dataschema.base import Token, _missing
+from dataschema.engine import Done, collect, run
+from dataschema.tokens.values import ExplicitValue, interning
+from dataschema.exceptions import SchemaError, ValidationError, Invalid
+from dataschema.views import DefaultsView, LazyDict, LazyList, read_only
 
 
-__all__ = ['And', 'Or', 'Dict', 'List']
+__all__ = ['And', 'Or', 'Dict', 'List', 'Ref']
+
+# Set, while a container checks values prefetched for all tokens below (see `ContainerToken._check_prefetched`)
+class _Prefetching(threading.local):
+	active = False
+
+_prefetching = _Prefetching()
+
+# The values validated by Dict. The results of `Dict.lazy_defaults` can be validated again
+_dicts = (dict, DefaultsView)
 
 
 
@@ -20,8 +34,76 @@ class ContainerToken(Token):
 	container
 	"""
 
-	def __init__(self, msg=None, desc=None):
-		super(ContainerToken, self).__init__(msg=msg, desc=desc)
+	def __init__(self, msg=None, desc=None, cache=None):
+		super(ContainerToken, self).__init__(msg=msg, desc=desc, cache=cache)
+		self._flags = {} # The results of `_any_below`
+
+	def _any_below(self, flag):
+		""" Like `Token._any_below`, but memoized, so the schema must be complete before it is validated """
+		found = self._flags.get(flag)
+		if found is None:
+			found = self._flags[flag] = any(getattr(token, flag)() for token in self.walk())
+		return found
+
+	def _nests(self):
+		""" True, if a child is a container, so `_steps` is needed to avoid recursion """
+		found = self._flags.get('nests')
+		if found is None:
+			found = self._flags['nests'] = any(isinstance(token, ContainerToken) for token in self.children())
+		return found
+
+	def _collect(self, values, errors):
+		""" Collect the failures with the generator of `_collect_steps` (see `dataschema.engine.collect`), so deep data
+		doesn't hit the recursion limit """
+		if self._any_below('_is_batched') and not _prefetching.active:
+			return self._check_prefetched(lambda values: collect(self, values, errors), values)
+		return collect(self, values, errors)
+
+	def _check_prefetched(self, check, values):
+		"""
+		Pass `values` to `_prefetch` of the tokens below (e.g. to look up all paths of IsPath at once) and return
+		`check(values)`. The containers below don't prefetch their part again meanwhile.
+		"""
+		_prefetching.active = True
+		try:
+			self._prefetch([values])
+			return check(values)
+		finally:
+			_prefetching.active = False
+
+	def _uses_async(self):
+		""" True, if a token below this container is asynchronous (see `Token.avalidate`). Otherwise `_acheck`
+		just calls `_check` """
+		return self._any_below('_is_async')
+
+	def _locate(self, failure, key=_missing):
+		"""
+		Store this container (and the `key` within dicts) as parent of the `failure` of a child, so the path
+		of shared children (see `ValueToken.shared`) can be created. Results, which are no failures, are
+		returned as they are.
+		"""
+		if isinstance(failure, Invalid) and failure.parent is None:
+			failure.parent = (self,) if key is _missing else (self, key)
+		return failure
+
+	def _child_json(self, token, key=_missing):
+		""" Return `as_json` of the child `token`. Shared children get their path from this container """
+		if getattr(token, '_shared', False):
+			return token.as_json(path=token.path_below(self, key))
+		return token.as_json()
+
+	def _get_inline_token(self, definition, copy):
+		"""
+		Return the token for `definition` like `get_token`. Dicts and lists written inline (e.g. {"a": [int]})
+		take over the `copy`-setting of their parent, so it only has to be given once for a whole document
+		"""
+		if not copy:
+			if isinstance(definition, dict) and not Dict.copy in definition:
+				definition = dict(definition)
+				definition[Dict.copy] = False
+			elif isinstance(definition, list):
+				return List(definition, copy=False)
+		return self.get_token(definition)
 
 
 # ============================================================================================================
@@ -37,20 +119,94 @@ class And(ContainerToken):
 
 	def __init__(self, *args, **kwargs):
 		super(And, self).__init__(desc=kwargs.pop('desc', None))
-		self.compiled = [self.get_token(arg) for arg in args]
+		with interning():
+			self.compiled = [self.get_token(arg) for arg in args]
 		self.set_path(None)
 
 
 	def set_path(self, parent_path):
 		super(And, self).set_path(parent_path)
 		for token in self.compiled:
-			token.set_path(self.path)
+			token.set_parent(self)
+
+	def children(self):
+		return list(self.compiled)
+
+	def _check(self, values):
+		for token in self.compiled:
+			values = token._check(values)
+			if isinstance(values, Invalid):
+				return self._locate(values)
+		return values
+
+	def _collect_steps(self, values, errors):
+		"""
+		Like `_check`, but after a failing check (e.g. Range or Regex, which leave the value as it is) the checks
+		directly following it are still run. Other tokens (e.g. Call or a converter) can't work on a value, which
+		failed before, so the walk stops at them, as it does after other failures (e.g. a wrong type)
+		"""
+		failure = None
+		for token in self.compiled:
+			if failure is not None and not token._is_check():
+				break
+			checked = yield (token, values)
+			if isinstance(checked, Invalid):
+				self._locate(checked)
+				failure = failure or checked
+				if errors.full or not token._is_check():
+					break
+			else:
+				values = checked
+		yield Done(values if failure is None else failure)
+
+	def _merge(self, layers):
+		""" The first token gets the layers to merge, the following ones the result """
+		values = layers[-1]
+		for index, token in enumerate(self.compiled):
+			values = token._merge(layers) if index == 0 else token._check(values)
+			if isinstance(values, Invalid):
+				return self._locate(values)
+		return values
+
+	def _steps(self, values):
+		if not self._nests():
+			return None
+		return self._iter_steps(values)
 
-	def _validate(self, values, default=None, has_default=False):
+	def _iter_steps(self, values):
 		for token in self.compiled:
-			values = token._validate(values)
+			values = yield (token, values)
+			if isinstance(values, Invalid):
+				yield Done(self._locate(values))
+				return
+		yield Done(values)
+
+	def _acheck(self, values, limit):
+		if not self._uses_async():
+			return self._check(values)
+		return self._achain(values, 0, limit)
+
+	def _achain(self, values, start, limit):
+		""" Check `values` with the children from `start` on, waiting for each asynchronous child before the next """
+		from dataschema.aio import is_pending, then
+		for index in range(start, len(self.compiled)):
+			values = self.compiled[index]._acheck(values, limit)
+			if is_pending(values):
+				return then(values, lambda result, index=index:
+					self._locate(result) if isinstance(result, Invalid) else self._achain(result, index + 1, limit))
+			if isinstance(values, Invalid):
+				return self._locate(values)
 		return values
 
+	def _prefetch(self, values):
+		for token in self.compiled:
+			token._prefetch(values)
+
+	def _compile(self, compiler, source, target):
+		for token in self.compiled:
+			source = compiler.inline(token, source, self)
+		compiler.emit("{} = {}".format(target, source))
+
 
 	def __add__(self, other):
 		""" Adding two and-tokens together. All entries of the first and are joined by the 
@@ -75,26 +231,244 @@ class Or(ContainerToken):
 	"""
 	This token holds a set of other tokens. If validate, the first token to successfully validate will be used.
 	If no token can validate the input, a ValidationError is raised
+
+	If the children are dicts, which all pin the same key to an explicit value (e.g. {"type": "a", ...}), that
+	key is used as discriminator and only the children pinning the value found in the input are tried. The
+	discriminator is detected automatically, or can be given with `discriminator=` (`False` to disable it).
 	"""
 
 	def __init__(self, *args, **kwargs):
-		super(Or, self).__init__(msg=kwargs.pop('msg', None), desc=kwargs.pop('desc', None))
-		self.compiled = [self.get_token(arg) for arg in args]
+		super(Or, self).__init__(msg=kwargs.pop('msg', None), desc=kwargs.pop('desc', None), cache=kwargs.pop('cache', None))
+		with interning():
+			self.compiled = [self.get_token(arg) for arg in args]
+		self.discriminator = self._find_discriminator(kwargs.pop('discriminator', None))
+		self._index_branches()
 		self.set_path(None)
 
+	def _tags(self, key):
+		""" Return the value each dict-child pins `key` to, by the index of the child """
+		tags = {}
+		for index, token in enumerate(self.compiled):
+			if isinstance(token, Dict) and isinstance(token.compiled_valuekeys.get(key), ExplicitValue):
+				tag = token.compiled_valuekeys[key].expected_value
+				try:
+					hash(tag)
+				except TypeError:
+					continue
+				tags[index] = tag
+		return tags
+
+	def _find_discriminator(self, discriminator):
+		if discriminator is False:
+			return None
+		elif discriminator is not None:
+			if not self._tags(discriminator):
+				raise SchemaError(u"No child of the Or-Token pins the discriminator `{}` to a value".format(discriminator))
+			return discriminator
+
+		# Take the key pinned by all dict-children, which seperates the most of them
+		dicts = [token for token in self.compiled if isinstance(token, Dict)]
+		found, found_count = None, 1
+		for key in (dicts[0].compiled_valuekeys if len(dicts) > 1 else []):
+			tags = self._tags(key)
+			if len(tags) == len(dicts) and len(set(tags.values())) > found_count:
+				found, found_count = key, len(set(tags.values()))
+		return found
+
+	def _index_branches(self):
+		""" Map each value of the discriminator to the children to try. Children without a value are tried for all of them """
+		self._branches, self._untagged = {}, self.compiled
+		if self.discriminator is None:
+			return
+
+		tags = self._tags(self.discriminator)
+		indexes = {}
+		for index, tag in tags.items():
+			indexes.setdefault(tag, set()).add(index)
+		for tag, tagged in indexes.items():
+			self._branches[tag] = [token for index, token in enumerate(self.compiled) if index in tagged or not index in tags]
+		self._untagged = [token for index, token in enumerate(self.compiled) if not index in tags]
+
+	def _candidates(self, values):
+		""" Return the children to try for `values` and if the discriminator found a tagged child """
+		if self.discriminator is None or not isinstance(values, _dicts):
+			return self.compiled, False
+		try:
+			return self._branches[values.get(self.discriminator)], True
+		except (KeyError, TypeError): # Unknown or unhashable values cant match any tag
+			return self._untagged, False
+
 	def set_path(self, parent_path):
 		super(Or, self).set_path(parent_path)
 		for token in self.compiled:
-			token.set_path(self.path)
+			token.set_parent(self)
 
-	def _validate(self, values, default=None, has_default=False):
+	def children(self):
+		return list(self.compiled)
+
+	def _tries(self, values):
+		"""
+		Generator of the children to try for `values`, which gets the result of each child sent back. The last
+		item is a `Done` with the first valid result or the failure (see `_no_match`)
+		"""
+		candidates, tagged = self._candidates(values)
+		failure = None
+		for token in candidates:
+			result = yield token
+			if not isinstance(result, Invalid):
+				yield Done(result)
+				return
+			if tagged and failure is None and not token in self._untagged:
+				failure = result # Report why the child with the matching tag failed
+		yield Done(self._no_match(values, failure))
+
+	def _check(self, values):
+		tries = self._tries(values)
+		step = next(tries)
+		while step.__class__ is not Done:
+			step = tries.send(step._check(values))
+		return step.result
+
+	def _collect_steps(self, values, errors):
+		""" Like `_check`, but if the discriminator found the only child to try, its failures are collected """
+		candidates, tagged = self._candidates(values)
+		if tagged and len(candidates) == 1:
+			checked = yield (candidates[0], values)
+			yield Done(self._locate(checked))
+			return
+		checked = run(self, values)
+		if isinstance(checked, Invalid):
+			errors.add(checked)
+		yield Done(checked)
+
+	def _merge(self, layers):
+		""" Like `_check`, but the children merge the layers. The discriminator is taken from the highest layer setting it """
+		tagged_layer = layers[-1]
+		if self.discriminator is not None:
+			for layer in reversed(layers):
+				if not isinstance(layer, _dicts): # Replaces the dicts below
+					break
+				if layer.get(self.discriminator) is not None:
+					tagged_layer = layer
+					break
+		tries = self._tries(tagged_layer)
+		step = next(tries)
+		while step.__class__ is not Done:
+			step = tries.send(step._merge(layers))
+		return step.result
+
+	def _steps(self, values):
+		if not self._nests():
+			return None
+		return self._iter_steps(values)
+
+	def _iter_steps(self, values):
+		tries = self._tries(values)
+		step = next(tries)
+		while step.__class__ is not Done:
+			step = tries.send((yield (step, values)))
+		yield step
+
+	def _acheck(self, values, limit):
+		if not self._uses_async():
+			return self._check(values)
+		tries = self._tries(values)
+		return self._atry(values, tries, next(tries), limit)
+
+	def _atry(self, values, tries, step, limit):
+		""" Go on with the generator `tries` of `_tries` from `step` on, waiting for each asynchronous child before the next """
+		from dataschema.aio import is_pending, then
+		while step.__class__ is not Done:
+			result = step._acheck(values, limit)
+			if is_pending(result):
+				return then(result, lambda result: self._atry(values, tries, tries.send(result), limit))
+			step = tries.send(result)
+		return step.result
+
+	def _prefetch(self, values):
 		for token in self.compiled:
-			try:
-				return token._validate(values)
-			except ValidationError as e:
-				pass
+			token._prefetch(values)
+
+	def _no_match(self, values, failure=None):
+		if self.discriminator is not None and isinstance(values, _dicts):
+			tag = values.get(self.discriminator)
+			if failure is not None:
+				return Invalid(self, values, u"Or-Token {} found no child for {} `{}` that validates the input: {}", self.discriminator, tag, failure)
+			return Invalid(self, values, u"Or-Token {} has no child for {} `{}`", self.discriminator, tag)
+		return Invalid(self, values, u"Or-Token {} found no child-token that validates the input `{}`", values)
 
-		raise ValidationError(self.msg or u"Or-Token {} found no child-token that validates the input `{}`".format(self.path, values))
+	def _compile(self, compiler, source, target):
+		if self.discriminator is not None:
+			return self._compile_discriminated(compiler, source, target)
+
+		found = compiler.name("found")
+		compiler.emit("{} = False".format(found))
+
+		# The errors of the children are never shown, so let them skip creating the messages
+		compiler.quiet += 1
+		for token in self.compiled:
+			compiler.emit("if not {}:".format(found))
+			with compiler.block():
+				compiler.emit("try:")
+				with compiler.block():
+					compiler.emit("{} = {}".format(target, compiler.inline(token, source, self)))
+					compiler.emit("{} = True".format(found))
+				compiler.emit("except ValidationError:")
+				with compiler.block():
+					compiler.emit("pass")
+		compiler.quiet -= 1
+
+		compiler.emit("if not {}:".format(found))
+		with compiler.block():
+			compiler.fail(self, source, "{}._no_match({})".format(compiler.const(self), source))
+
+	def _compile_discriminated(self, compiler, source, target):
+		# Each child gets its own function, so the candidates can be picked by the tag at runtime. Only the
+		# errors of the tagged children are reported (see `_check`), so the others skip creating the messages
+		functions = {}
+		for token in self.compiled:
+			quiet = token in self._untagged
+			compiler.quiet += quiet
+			functions[id(token)] = compiler.function(token, self)
+			compiler.quiet -= quiet
+		def function_list(tokens):
+			return "[{}]".format(", ".join(functions[id(token)] for token in tokens))
+
+		branches = compiler.define("branches", "{{{}}}".format(", ".join(
+				"{}: {}".format(compiler.const(tag), function_list(tokens)) for tag, tokens in self._branches.items())))
+		untagged = compiler.define("untagged", function_list(self._untagged))
+		candidates, function, found = compiler.name("candidates"), compiler.name("f"), compiler.name("found")
+		failure, error = compiler.name("failure"), compiler.name("error")
+
+		compiler.emit("if isinstance({}, {}):".format(source, compiler.const(_dicts)))
+		with compiler.block():
+			compiler.emit("try:")
+			with compiler.block():
+				compiler.emit("{} = {}.get({}.get({}), {})".format(candidates, branches, source, compiler.const(self.discriminator), untagged))
+			compiler.emit("except TypeError:")
+			with compiler.block():
+				compiler.emit("{} = {}".format(candidates, untagged))
+		compiler.emit("else:")
+		with compiler.block():
+			compiler.emit("{} = {}".format(candidates, function_list(self.compiled)))
+
+		compiler.emit("{} = False".format(found))
+		compiler.emit("{} = None".format(failure))
+		compiler.emit("for {} in {}:".format(function, candidates))
+		with compiler.block():
+			compiler.emit("try:")
+			with compiler.block():
+				compiler.emit("{} = {}({})".format(target, function, source))
+				compiler.emit("{} = True".format(found))
+				compiler.emit("break")
+			compiler.emit("except ValidationError as {}:".format(error))
+			with compiler.block():
+				compiler.emit("if {} is None and {}.message is not None:".format(failure, error))
+				with compiler.block():
+					compiler.emit("{} = {}".format(failure, error))
+		compiler.emit("if not {}:".format(found))
+		with compiler.block():
+			compiler.fail(self, source, "{}._no_match({}, {})".format(compiler.const(self), source, failure))
 
 	def as_json(self, **kwargs):
 		_tmp = {key: token.as_json() for key, token in self.compiled.items()}
@@ -107,7 +481,8 @@ class Or(ContainerToken):
 		"""
 		if not isinstance(other, Or):
 			raise SchemaError(u"Can't combine none-Or-token `{}` and Or-token `{}`!".format(other, self))
-		return Or(*(self.compiled + other.compiled))
+		discriminator = self.discriminator if self.discriminator == other.discriminator else None
+		return Or(*(self.compiled + other.compiled), discriminator=discriminator)
 
 
 	def __repr__(self):
@@ -121,9 +496,8 @@ class Or(ContainerToken):
 class TypeKey(object):
 	"""
 	A typekey is used in the dict, if not a value (e.g. {"a": int}) is used, but a 
-	type (e.g. {str: object})). TypeKeys have an ordering, where a more specific Key 
-	is less then less specific one (bool < int < number), which gives more specific keys
-	the chance to check their value first. 
+	type (e.g. {str: object})). If more than one typekey matches a key, the more specific 
+	one (the one found first in the mro of the key) wins, e.g. bool before int before object.
 	"""
 	def __init__(self, key_type):
 		self.key_type = key_type
@@ -131,13 +505,13 @@ class TypeKey(object):
 	def matches(self, value_key):
 		return isinstance(value_key, self.key_type)
 
+	def specificity(self):
+		""" The length of the mro of the type. Used to list more specific typekeys first """
+		return len(inspect.getmro(self.key_type))
+
 	def __repr__(self):
 		return u"<Dict.TypeKey {}>".format(self.key_type.__name__)
 
-	def __cmp__(self, other):
-		""" return -1 (smaller) if self is a child of other, else we dont care """
-		return -1 if issubclass(self.key_type, other.key_type) else 0
-
 
 
 class Dict(ContainerToken):
@@ -154,7 +528,7 @@ class Dict(ContainerToken):
 	"""
 	
 	# Static objects for storing infos on the dict. object is used, to get a unique object to store in the dict
-	default, skip_unknown_keys, desc, required, fixed, msg = object(), object(), object(), object(), object(), object()
+	default, skip_unknown_keys, desc, required, fixed, msg, cache, copy, lazy_defaults = object(), object(), object(), object(), object(), object(), object(), object(), object()
 	
 	
 	def __init__(self, definition):
@@ -173,79 +547,530 @@ class Dict(ContainerToken):
 		self.default = definition.pop(Dict.default, None)
 		self.desc = definition.pop(Dict.desc, None)
 		self.msg = definition.pop(Dict.msg, None)
+		cache = definition.pop(Dict.cache, None)
+		if cache not in (None, False): # Only hashable dicts (e.g. frozen dict-subclasses) can be cached
+			self._set_cache(cache)
+		self.copy = definition.pop(Dict.copy, True)
+		self.lazy_defaults = definition.pop(Dict.lazy_defaults, False)
 
 		# As a first step get all keys, distinguish them and get the token
 		self.compiled_valuekeys = {}
 		self.compiled_typekeys = {}
 	
-		for key, value in definition.items():
-			token = self.get_token(value)
-
-			if isinstance(key, Token):
-				raise NotImplementedError(u"This is currently not supported! Use basic types!")
-			elif isinstance(key, type):
-				self.compiled_typekeys[TypeKey(key)] = token
-			else:
-				self.compiled_valuekeys[key] = token
+		with interning(): # Identical value tokens are shared within the schema (see `ValueToken.shared`)
+			for key, value in definition.items():
+				token = self._get_inline_token(value, self.copy)
+
+				if isinstance(key, Token):
+					raise NotImplementedError(u"This is currently not supported! Use basic types!")
+				elif isinstance(key, type):
+					self.compiled_typekeys[TypeKey(key)] = token
+				else:
+					self.compiled_valuekeys[key] = token
 		
 		# Now order the Typekey-dict with respect to their priority
-		self.compiled_typekeys = OrderedDict(sorted(self.compiled_typekeys.items(), key=lambda t: t[0]))
+		self.compiled_typekeys = OrderedDict(sorted(self.compiled_typekeys.items(), key=lambda t: -t[0].specificity()))
+
+		# Maps the class of a key to the TypeKey handling it (or None). Filled by `_resolve_typekey`
+		self._typekey_cache = {}
+		self._index_keys()
 		
 		self.set_path(None)
 
 	def set_path(self, parent_path):
 		super(Dict, self).set_path(parent_path)
 		for key, token in self.compiled_valuekeys.items():
-			token.set_path(u"{}:{}".format(self.path, key))
+			token.set_parent(self, key)
 		for key, token in self.compiled_typekeys.items():
-			token.set_path(u"{}:{}".format(self.path, key))
+			token.set_parent(self, key)
 
+	def children(self):
+		return list(self.compiled_valuekeys.values()) + list(self.compiled_typekeys.values())
 		
-	def _validate(self, value, default=None, has_default=False):
+	def _check(self, value):
 		"""
 		Validate the dictionary. This will first iterate through the `compiled_valuekeys` and process each 
 		entry with the matching entry in `value` (Keys that are not found in value will be validate with None as value.
-		If the token wont allow that, a ValidationError is raised!)
+		If the token wont allow that, the dict is invalid!)
 		Next up, each entry that was not yet validated in values will be passed to the first handler in `compiled_typekeys`, 
 		if there is a matching one. `validate` will be called on the found handler, with the entry in `value`.
 		At last, if there are still unprocessed entries in value, we will check if that is allowed or not
 		"""
 		# we dont have data, so check if there is a default and if so, return that
-		if value == None:
-			if self.default == None and self.required:
-				raise ValidationError(self.msg or u"Value passed to {} should have values, but is None!".format(self.path))
+		if value is None:
+			if self.default is None and self.required:
+				return Invalid(self, value, u"Value passed to {} should have values, but is None!")
 			return self.default
 			
 		# check we have the right kind of data
-		elif not isinstance(value, dict):
-			raise ValidationError(self.msg or u"Value passed to {} is not a dict! (value: {})".format(self.path, type(value)))
+		elif not isinstance(value, _dicts):
+			return Invalid(self, value, u"Value passed to {} is not a dict! (value: {})", type(value))
+
+		if self._any_below('_is_batched') and not _prefetching.active:
+			return self._check_prefetched(self._check, value)
+
+		if not self.copy:
+			return self._check_shared(value)
 
 		# we have both data and is the right type, so validate it
 		else:
-			result = {}
-			tmp = {k: v for k, v in value.items()} # Create a copy of the input, so the input is not changed
+			valuekeys = self.compiled_valuekeys
+			if len(value) < len(valuekeys): # Less keys given than known, so only the given ones are looked at
+				present = self._keys.intersection(value)
+				# The results of the missing keys are known in advance (and taken from the view with lazy_defaults)
+				result = {} if self.lazy_defaults else dict(self._defaults)
+				for key in self._in_order(self._checked_keys.union(present)): # The other missing keys are checked with None
+					checked = valuekeys[key]._check(value[key] if key in present else None)
+					if isinstance(checked, Invalid):
+						return self._locate(checked, key)
+					result[key] = checked
+				found = len(present)
+
+			else: # Otherwise look up each value-key in the value-dict
+				result, found = {}, len(valuekeys)
+				defaults, missing = self._defaults, _missing
+				for key, token in valuekeys.items():
+					item = value.get(key, missing)
+					if item is missing:
+						found -= 1
+						if key in defaults:
+							if self.lazy_defaults:
+								continue
+							checked = defaults[key]
+						else:
+							checked = token._check(None)
+					else:
+						checked = token._check(item)
+					if isinstance(checked, Invalid):
+						return self._locate(checked, key)
+					result[key] = checked
+
+			# Now try to match the compiled_typekeys to the left-over keys
+			if len(value) > found and (self.compiled_typekeys or not self.skip_unknown_keys):
+				unknown = {}
+				for key, item in value.items():
+					if key in valuekeys:
+						continue
+					dictkeytype = self._typekey_for(key)
+					if dictkeytype is None:
+						unknown[key] = item
+						continue
+					checked = self.compiled_typekeys[dictkeytype]._check(item)
+					if isinstance(checked, Invalid):
+						return self._locate(checked, dictkeytype)
+					result[key] = checked
+
+				# now just check if there are leftovers and if they are allowed
+				if not self.skip_unknown_keys and unknown:
+					return self._unknown_keys(unknown)
 
-			
-			# First validate each token found in the value-dict
-			for key, token in self.compiled_valuekeys.items():
-				result[key] = token._validate(tmp.pop(key, None))
-			
-			# Now try to match the compiled_typekeys to the left-over values (If match, validate and remove value)
-			for key, value in tmp.items():
-				for dictkeytype, token in self.compiled_typekeys.items():
-					if dictkeytype.matches(key):
-						result[key] = token._validate(value)
-						del tmp[key]
-						break
+			# return the final dict
+			if self.lazy_defaults and self._defaults and found < len(valuekeys):
+				return DefaultsView(result, self._shared_defaults)
+			return result
 
-	
+	def _is_static(self):
+		return True
 
-			# now just check if there are leftovers and if they are allowed. If so, add them 
-			if not self.skip_unknown_keys and len(tmp) > 0:
-				raise ValidationError(u"Dict '{}'' is fixed but encountered additional values: {}".format(self.path, tmp))
+	def _present_keys(self, value):
+		""" Return the set of value-keys found in the dict `value`. The smaller of both is iterated """
+		if len(value) <= len(self._keys):
+			return self._keys.intersection(value)
+		return frozenset([key for key in self._keys if key in value])
 
-			# return the final dict
+	def _in_order(self, keys):
+		"""
+		Return the value-keys `keys` in the order of the schema, so the first failure reported is the same
+		for every hash seed and the same as the one of the compiled validator
+		"""
+		if len(keys) == len(self._ordered_keys):
+			return self._ordered_keys
+		return sorted(keys, key=self._positions.__getitem__)
+
+	def _index_keys(self):
+		"""
+		Precompute the sets of value-keys used by `_check`: `_keys` holds all of them and `_defaults` the results
+		for the keys, which may be missing and whose result for None is known in advance (see `Token._is_static`).
+		The other keys in `_checked_keys` (e.g. required ones) are still checked with None, if they are missing.
+		The sets are iterated with `_in_order`, which sorts them like `_ordered_keys`. The views of `lazy_defaults`
+		get a read-only proxy of `_defaults`.
+		"""
+		self._ordered_keys = tuple(self.compiled_valuekeys)
+		self._positions = {key: index for index, key in enumerate(self._ordered_keys)}
+		self._keys = frozenset(self._ordered_keys)
+		self._defaults = {}
+		for key, token in self.compiled_valuekeys.items():
+			if token._is_static():
+				result = token._check(None)
+				if not isinstance(result, Invalid):
+					self._defaults[key] = result
+		self._checked_keys = self._keys.difference(self._defaults)
+		self._shared_defaults = read_only(self._defaults)
+
+	def _check_shared(self, value):
+		"""
+		Validate the dict `value` like `_check`, but return `value` itself, if no entry was changed (see `Dict.copy`).
+		The result is only copied from `value`, once an entry changes, so unchanged entries are shared.
+		"""
+		result = None
+
+		present, missing = self._present_keys(value), {}
+		for key in self._in_order(self._checked_keys.union(present)):
+			if not key in present: # Missing keys are checked with None
+				checked = self.compiled_valuekeys[key]._check(None)
+				if isinstance(checked, Invalid):
+					return self._locate(checked, key)
+				missing[key] = checked
+				continue
+			item = value[key]
+			checked = self.compiled_valuekeys[key]._check(item)
+			if isinstance(checked, Invalid):
+				return self._locate(checked, key)
+			if checked is not item:
+				if result is None:
+					result = dict(value)
+				result[key] = checked
+
+		if len(present) < len(self._keys): # Missing keys are filled in, so the result is a new dict
+			filled = {} if self.lazy_defaults else dict(self._defaults)
+			filled.update(missing)
+			if filled or not self.lazy_defaults: # With lazy_defaults the input is shared, unless other keys are filled in
+				filled.update(value if result is None else result)
+				result = filled
+
+		unknown = []
+		for key, item in value.items():
+			if key in self.compiled_valuekeys:
+				continue
+			dictkeytype = self._typekey_for(key)
+			if dictkeytype is None:
+				unknown.append(key)
+				continue
+			checked = self.compiled_typekeys[dictkeytype]._check(item)
+			if isinstance(checked, Invalid):
+				return self._locate(checked, dictkeytype)
+			if checked is not item:
+				if result is None:
+					result = dict(value)
+				result[key] = checked
+
+		if unknown:
+			if not self.skip_unknown_keys:
+				return self._unknown_keys({key: value[key] for key in unknown})
+			if result is None:
+				result = dict(value)
+			for key in unknown: # Unknown keys are left out, as in `_check`
+				del result[key]
+		result = value if result is None else result
+		if self.lazy_defaults and self._defaults and len(present) < len(self._keys):
+			return DefaultsView(result, self._shared_defaults)
+		return result
+
+	def _prefetch(self, values):
+		""" Pass the entries of the dicts in `values` on to the tokens checking them """
+		values = [value for value in values if isinstance(value, _dicts)]
+		for key, token in self.compiled_valuekeys.items():
+			if token._any_below('_is_batched'):
+				token._prefetch([value.get(key) for value in values])
+		batched = {dictkeytype: [] for dictkeytype, token in self.compiled_typekeys.items() if token._any_below('_is_batched')}
+		if batched:
+			for value in values:
+				for key, item in value.items():
+					if not key in self.compiled_valuekeys:
+						dictkeytype = self._typekey_for(key)
+						if dictkeytype in batched:
+							batched[dictkeytype].append(item)
+			for dictkeytype, items in batched.items():
+				self.compiled_typekeys[dictkeytype]._prefetch(items)
+
+	def _entries(self, value):
+		"""
+		Match the dict `value` to the tokens. Returns a list of `(key, location, token, item)` with the location
+		of failures (the key or the typekey) for the entries to check and the list of unknown keys. Value-keys
+		missing in `value` are checked with None.
+		"""
+		entries, unknown = [], []
+		for key, token in self.compiled_valuekeys.items():
+			entries.append((key, key, token, value.get(key)))
+		for key, item in value.items():
+			if key in self.compiled_valuekeys:
+				continue
+			dictkeytype = self._typekey_for(key)
+			if dictkeytype is None:
+				unknown.append(key)
+			else:
+				entries.append((key, dictkeytype, self.compiled_typekeys[dictkeytype], item))
+		return entries, unknown
+
+	def _collect_steps(self, value, errors):
+		""" Like `_check`, but the failures of all entries are added to `errors` (see `Token.errors`), until it is full """
+		if not isinstance(value, _dicts):
+			yield Done(Token._collect(self, value, errors))
+			return
+
+		entries, unknown = self._entries(value)
+		result, failure = {}, None
+		for key, location, token, item in entries:
+			checked = yield (token, item)
+			if isinstance(checked, Invalid):
+				self._locate(checked, location)
+				failure = failure or checked
+				if errors.full:
+					yield Done(failure)
+					return
+			else:
+				result[key] = checked
+
+		if unknown and not self.skip_unknown_keys:
+			unknown = errors.add(self._unknown_keys({key: value[key] for key in unknown}))
+			failure = failure or unknown
+		yield Done(result if failure is None else failure)
+
+	def _acheck(self, value, limit):
+		"""
+		Validate the dict `value` like `_check`, but start the checks of all entries at once, so their asynchronous
+		functions run concurrently (see `Token.avalidate`). The result is created, once all of them are done.
+		"""
+		if not isinstance(value, _dicts) or not self._uses_async():
+			return self._check(value)
+		from dataschema.aio import gather
+
+		entries, unknown = self._entries(value)
+		checks = [(token, item) for key, location, token, item in entries]
+		return gather(checks, limit, lambda results: self._assemble(value, entries, results, unknown))
+
+	def _merge(self, layers):
+		"""
+		Validate the merge of the dicts in `layers` (see `Token.merge_validate`). The values of each key in all layers
+		are passed on to its token at once, so nested dicts are merged as well. Only the dicts at the top of the
+		layers are merged, a higher layer with another value (e.g. a list) replaces all below.
+		"""
+		start = len(layers)
+		while start > 0 and isinstance(layers[start - 1], _dicts):
+			start -= 1
+		if len(layers) - start < 2:
+			return self._check(layers[-1])
+		layers = layers[start:]
+
+		given = {} # key -> the values of all layers setting it
+		for layer in layers:
+			for key, item in layer.items():
+				if item is not None:
+					given.setdefault(key, []).append(item)
+
+		valuekeys = self.compiled_valuekeys
+		present = self._keys.intersection(given)
+		result = dict(self._defaults) if len(present) < len(self._keys) and not self.lazy_defaults else {}
+		for key in self._in_order(self._checked_keys.union(present)): # Missing keys are checked with None
+			checked = valuekeys[key]._merge(given[key]) if key in present else valuekeys[key]._check(None)
+			if isinstance(checked, Invalid):
+				return self._locate(checked, key)
+			result[key] = checked
+
+		unknown = {}
+		if len(given) > len(present):
+			for key, items in given.items():
+				if key in valuekeys:
+					continue
+				dictkeytype = self._typekey_for(key)
+				if dictkeytype is None:
+					unknown[key] = items[-1]
+					continue
+				checked = self.compiled_typekeys[dictkeytype]._merge(items)
+				if isinstance(checked, Invalid):
+					return self._locate(checked, dictkeytype)
+				result[key] = checked
+		if unknown and not self.skip_unknown_keys:
+			return self._unknown_keys(unknown)
+		if self.lazy_defaults and self._defaults and len(present) < len(self._keys):
+			return DefaultsView(result, self._shared_defaults)
+		return result
+
+	def _steps(self, value):
+		if not isinstance(value, _dicts) or not self._nests():
+			return None
+		return self._iter_steps(value)
+
+	def _iter_steps(self, value):
+		entries, unknown = self._entries(value)
+		results = []
+		for key, location, token, item in entries:
+			checked = yield (token, item)
+			if isinstance(checked, Invalid):
+				yield Done(self._locate(checked, location))
+				return
+			results.append(checked)
+		yield Done(self._assemble(value, entries, results, unknown))
+
+	def _assemble(self, value, entries, results, unknown):
+		""" Create the result of `_acheck` or `_steps` from the `results` of the checked `entries` """
+		for (key, location, token, item), checked in zip(entries, results):
+			if isinstance(checked, Invalid):
+				return self._locate(checked, location)
+		if unknown and not self.skip_unknown_keys:
+			return self._unknown_keys({key: value[key] for key in unknown})
+
+		if not (self.copy or unknown):
+			for (key, location, token, item), checked in zip(entries, results):
+				if checked is not item or not key in value:
+					break
+			else:
+				return value
+		result = {key: checked for (key, location, token, item), checked in zip(entries, results)}
+		if self.lazy_defaults:
+			missing = [key for key in self._defaults if not key in value]
+			if missing:
+				for key in missing: # The defaults of missing keys are taken from the view
+					del result[key]
+				return DefaultsView(result, self._shared_defaults)
+		return result
+
+	def _lazy(self, value):
+		""" Check the keys of the dict `value` and return a `LazyDict` validating the entries on access """
+		if not isinstance(value, _dicts):
+			return self._check(value)
+		entries, unknown = self._entries(value)
+		if unknown and not self.skip_unknown_keys:
+			return self._unknown_keys({key: value[key] for key in unknown})
+		return LazyDict(self, {key: (location, token, item) for key, location, token, item in entries})
+
+	def _recheck(self, previous, result, value):
+		"""
+		Validate `value` like `_check`, but take the results for keys, which are equal to the ones in `previous`,
+		from `result`. If nothing changed, `result` itself is returned.
+		"""
+		if value is previous:
 			return result
+		elif not (isinstance(value, dict) and isinstance(previous, dict) and isinstance(result, dict)):
+			return self._check(value)
+
+		checked, changed, unknown = {}, len(value) != len(previous), {}
+		for key, item in value.items():
+			token, location = self.compiled_valuekeys.get(key), key
+			if token is None and self.compiled_typekeys:
+				dictkeytype = self._typekey_for(key)
+				token, location = self.compiled_typekeys[dictkeytype] if dictkeytype is not None else None, dictkeytype
+			if token is None:
+				unknown[key] = item
+				continue
+
+			if key in previous and key in result:
+				checked[key] = token._recheck(previous[key], result[key], item)
+			else:
+				checked[key] = token._check(item)
+			if isinstance(checked[key], Invalid):
+				return self._locate(checked[key], location)
+			changed = changed or not key in result or checked[key] is not result[key]
+
+		# Keys missing in value are validated with None
+		for key, token in self.compiled_valuekeys.items():
+			if not key in checked:
+				checked[key] = token._recheck(previous.get(key), result[key], None) if key in result else token._check(None)
+				if isinstance(checked[key], Invalid):
+					return self._locate(checked[key], key)
+				changed = changed or not key in result or checked[key] is not result[key]
+
+		if not self.skip_unknown_keys and unknown:
+			return self._unknown_keys(unknown)
+		return checked if changed or len(checked) != len(result) else result
+
+	def __getstate__(self):
+		# The cache may hold classes, which can't be pickled. It is filled again on demand anyway
+		state = super(Dict, self).__getstate__()
+		state['_typekey_cache'] = {}
+		del state['_shared_defaults'] # The proxy can't be pickled
+		return state
+
+	def __setstate__(self, state):
+		super(Dict, self).__setstate__(state)
+		self._shared_defaults = read_only(self._defaults)
+
+	def _typekey_for(self, key):
+		""" Return the TypeKey handling `key` or None. The result is cached for the class of the key """
+		if not self.compiled_typekeys:
+			return None
+		cache = self._typekey_cache
+		key_class = key.__class__
+		return cache[key_class] if key_class in cache else self._resolve_typekey(key)
+
+	def _resolve_typekey(self, key):
+		"""
+		Find the TypeKey for `key` and cache it for the class of the key. The typekey found first in the mro
+		of the class wins. Typekeys not part of the mro (e.g. abstract base classes) are checked with isinstance
+		afterwards, the most specific first (see `compiled_typekeys`). `object` matches every key, so it is only
+		used, if no other typekey matches. Returns None if no typekey matches.
+		"""
+		by_type = {dictkeytype.key_type: dictkeytype for dictkeytype in self.compiled_typekeys}
+		match = None
+		for key_type in inspect.getmro(key.__class__):
+			if key_type in by_type and key_type is not object:
+				match = by_type[key_type]
+				break
+		else:
+			for dictkeytype in self.compiled_typekeys:
+				if dictkeytype.key_type is not object and dictkeytype.matches(key):
+					match = dictkeytype
+					break
+			else:
+				match = by_type.get(object)
+
+		self._typekey_cache[key.__class__] = match
+		return match
+
+	def _unknown_keys(self, values):
+		return Invalid(self, values, u"Dict '{}'' is fixed but encountered additional values: {}", values)
+
+	def _compile(self, compiler, source, target):
+		if not self.copy or self.lazy_defaults or self._any_below('_is_batched'):
+			return Token._compile(self, compiler, source, target)
+		compiler.emit("if {} is None:".format(source))
+		with compiler.block():
+			if self.default is None and self.required:
+				compiler.fail(self, source)
+			else:
+				compiler.emit("{} = {}".format(target, compiler.const(self.default)))
+		compiler.emit("elif not isinstance({}, {}):".format(source, compiler.const(_dicts)))
+		with compiler.block():
+			compiler.fail(self, source)
+		compiler.emit("else:")
+		with compiler.block():
+			result = compiler.name("result")
+			compiler.emit("{} = {{}}".format(result))
+
+			# Look up each value-key directly
+			for key, token in self.compiled_valuekeys.items():
+				value = compiler.name("v")
+				compiler.emit("{} = {}.get({})".format(value, source, compiler.const(key)))
+				compiler.emit("{}[{}] = {}".format(result, compiler.const(key), compiler.inline(token, value, self, key)))
+
+			# The left-over keys only need to be looked at, if they can be matched or must be reported
+			if self.compiled_typekeys or not self.skip_unknown_keys:
+				key, value, unknown = compiler.name("k"), compiler.name("v"), compiler.name("unknown")
+				valuekeys = compiler.const(frozenset(self.compiled_valuekeys))
+				if not self.skip_unknown_keys:
+					compiler.emit("{} = {{}}".format(unknown))
+				compiler.emit("for {}, {} in {}.items():".format(key, value, source))
+				with compiler.block():
+					compiler.emit("if {} in {}:".format(key, valuekeys))
+					with compiler.block():
+						compiler.emit("continue")
+					if self.compiled_typekeys:
+						match, cache = compiler.name("match"), compiler.const(self._typekey_cache)
+						compiler.emit("{} = {}[{}.__class__] if {}.__class__ in {} else {}({})".format(
+							match, cache, key, key, cache, compiler.const(self._resolve_typekey), key))
+					for dictkeytype, token in self.compiled_typekeys.items():
+						compiler.emit("if {} is {}:".format(match, compiler.const(dictkeytype)))
+						with compiler.block():
+							compiler.emit("{}[{}] = {}".format(result, key, compiler.inline(token, value, self, dictkeytype)))
+							compiler.emit("continue")
+					if not self.skip_unknown_keys:
+						compiler.emit("{}[{}] = {}".format(unknown, key, value))
+
+				if not self.skip_unknown_keys:
+					compiler.emit("if {}:".format(unknown))
+					with compiler.block():
+						compiler.fail(self, source, "{}._unknown_keys({})".format(compiler.const(self), unknown))
+			compiler.emit("{} = {}".format(target, result))
 
 	
 	
@@ -265,7 +1090,7 @@ class Dict(ContainerToken):
 		for key, token in self.compiled_valuekeys.items():
 			definition[key] = token
 		for key, token in self.compiled_typekeys.items():
-			definition[key] = token
+			definition[key.key_type] = token
 
 		# Update from other
 		for key, token in other.compiled_valuekeys.items():
@@ -275,17 +1100,19 @@ class Dict(ContainerToken):
 			definition[key] = token
 		
 		for key, token in other.compiled_typekeys.items():
-			if key in definition:
+			if key.key_type in definition:
 				raise SchemaError(u"Can't merge {} with {}, because of multiple key `{}`.".format(self, other, key))
-			definition[key] = token
+			definition[key.key_type] = token
 	
 		# Add Settings from self and other (the resulting dict will have the stricter of each rules)
 		definition[Dict.required] = self.required or other.required
 		definition[Dict.skip_unknown_keys] = self.skip_unknown_keys and other.skip_unknown_keys
 		definition[Dict.desc] = self.desc
-		if self.default != None and other.default != None:
+		if self.default is not None and other.default is not None:
 			raise SchemaError(u"Both Dict-tokens have defaults. Cant merge!")
 		definition[Dict.default] = self.default or other.default
+		definition[Dict.copy] = self.copy and other.copy
+		definition[Dict.lazy_defaults] = self.lazy_defaults or other.lazy_defaults
 		
 		return Dict(definition)
 		
@@ -294,9 +1121,9 @@ class Dict(ContainerToken):
 		
 		
 	def as_json(self, **kwargs):
-		_tmp = {key: token.as_json() for key, token in self.compiled_valuekeys.items()}
+		_tmp = {key: self._child_json(token, key) for key, token in self.compiled_valuekeys.items()}
 		for key, token in self.compiled_typekeys.items():
-			_tmp[key] = token.as_json()
+			_tmp[key] = self._child_json(token, key)
 		return super(Dict, self).as_json(name="dict", skip_unknown_keys=self.skip_unknown_keys, required=self.required, desc=self.desc, default=self.default, **_tmp)
 
 
@@ -310,39 +1137,240 @@ class List(ContainerToken):
 
 	ds.Schema([int]) will match [1, 2, 3]
 	ds.Schema(ds.Or(int, bool)) -> [1, True, 2]
+
+	With `vectorize=True` lists of Int, Float or Decimal (optionally in an And with Range, Min or Max) are
+	checked at once with numpy, instead of element by element. Without numpy the elements are validated
+	as usual.
+
+	Buffers (array.array, memoryview and numpy-arrays) are validated like lists. The type of their elements
+	is only checked once and the buffer itself is returned, unless an element was converted.
+
+	With `copy=False` the list itself is returned, if no element was changed (see `Dict.copy`).
 	"""
-	def __init__(self, definition):
+	def __init__(self, definition, vectorize=False, copy=True):
 		super(List, self).__init__()
+		self.copy = copy
 
 		# If we get a list, the inplace-style was used (e.g. ds.Or([int], ...))
 		if isinstance(definition, list):
 			if len(definition) != 1:
 				raise SchemaError(u"List must have exactly one definition-parameter! e.g. [int])")
-			self.definition = self.get_token(definition[0])
-		
+			definition = definition[0]
+
 		# Otherwise we should have explicit init (e.g. ds.Or(ds.List(int))))
-		else:
-			self.definition = self.get_token(definition)
+		with interning():
+			self.definition = self._get_inline_token(definition, copy)
+
+		self.numeric_plan = None
+		if vectorize:
+			from dataschema.vector import numeric_plan
+			self.numeric_plan = numeric_plan(self.definition)
 
 		self.set_path(None)
 
-	def _validate(self, value, default=None, has_default=False):
+	def _check(self, value):
 		"""	This will validate the values. The given value must be a list and each entry 
 		in this list is passed to the token defined in self.definition. """
 		# we dont have data, so check if there is a default and if so, return that
-		if value == None:
-			raise ValidationError(u"Value passed to {} should be a list, but is None!".format(self.path))
+		if value is None:
+			return Invalid(self, value, u"Value passed to {} should be a list, but is None!")
 			
 		# check we have the right kind of data
 		elif not isinstance(value, list):
-			raise ValidationError(u"Value passed to {} is not a list! (value: {})".format(self.path, type(value)))
+			from dataschema.vector import is_buffer
+			if is_buffer(value):
+				return self._check_buffer(value)
+			return Invalid(self, value, u"Value passed to {} is not a list! (value: {})", type(value))
+
+		if self._any_below('_is_batched') and not _prefetching.active:
+			return self._check_prefetched(self._check, value)
+
+		if self.numeric_plan:
+			from dataschema.vector import check_numeric
+			index = check_numeric(self.numeric_plan, value)
+			if index == -1:
+				return list(value) if self.copy else value
+			elif index is not None: # The same error, as if the elements were checked one by one
+				return self._locate(self.definition._check(value[index]))
+
+		if not self.copy:
+			return self._check_shared(value)
 
 		# now validate each entry
-		return [self.definition._validate(e) for e in value]
+		result = []
+		append = result.append
+		check = self.definition._check
+		for e in value:
+			checked = check(e)
+			if isinstance(checked, Invalid):
+				return self._locate(checked)
+			append(checked)
+		return result
+
+	def _is_static(self):
+		return True
+
+	def _prefetch(self, values):
+		""" Pass the elements of the lists in `values` on to the token checking them """
+		self.definition._prefetch([e for value in values if isinstance(value, list) for e in value])
+
+	def _check_shared(self, value):
+		""" Validate the list `value` like `_check`, but return `value` itself, if no element was changed. Otherwise
+		only the elements up to the first change are copied into the result """
+		result = None
+		check = self.definition._check
+		for index, e in enumerate(value):
+			checked = check(e)
+			if isinstance(checked, Invalid):
+				return self._locate(checked)
+			if result is not None:
+				result.append(checked)
+			elif checked is not e:
+				result = value[:index]
+				result.append(checked)
+		return value if result is None else result
+
+	def _collect_steps(self, value, errors):
+		""" Like `_check`, but the failures of all elements are added to `errors` (see `Token.errors`), until it is full """
+		if not isinstance(value, list):
+			yield Done(Token._collect(self, value, errors))
+			return
+
+		result, failure = [], None
+		definition = self.definition
+		for e in value:
+			checked = yield (definition, e)
+			if isinstance(checked, Invalid):
+				self._locate(checked)
+				failure = failure or checked
+				if errors.full:
+					break
+			else:
+				result.append(checked)
+		yield Done(result if failure is None else failure)
+
+	def _acheck(self, value, limit):
+		""" Validate the list `value` like `_check`, but start the checks of all elements at once, so their
+		asynchronous functions run concurrently (see `Token.avalidate`) """
+		if not isinstance(value, list) or not self._uses_async():
+			return self._check(value)
+		from dataschema.aio import gather
+		return gather([(self.definition, e) for e in value], limit, lambda results: self._assemble(value, results))
+
+	def _steps(self, value):
+		if not isinstance(value, list) or self.numeric_plan or not self._nests():
+			return None
+		return self._iter_steps(value)
+
+	def _iter_steps(self, value):
+		results = []
+		for e in value:
+			checked = yield (self.definition, e)
+			if isinstance(checked, Invalid):
+				yield Done(self._locate(checked))
+				return
+			results.append(checked)
+		yield Done(self._assemble(value, results))
+
+	def _assemble(self, value, results):
+		""" Create the result of `_acheck` or `_steps` from the checked elements """
+		for checked in results:
+			if isinstance(checked, Invalid):
+				return self._locate(checked)
+		if not self.copy and all(checked is e for checked, e in zip(results, value)):
+			return value
+		return results
+
+	def _check_buffer(self, value):
+		"""
+		Validate the elements of a array.array, memoryview or numpy-array. If the element-token is a Int, Float
+		or Decimal (see `List.vectorize`) matching the type of the buffer, the type is checked once for all
+		elements. The buffer is returned without copying it, unless an element was converted.
+		"""
+		from dataschema.vector import numeric_plan, buffer_type, check_numeric
+		element_type = buffer_type(value)
+		if element_type is None:
+			return Invalid(self, value, u"Value passed to {} is a buffer of unknown format! (value: {})", type(value))
+
+		plan = numeric_plan(self.definition)
+		index = check_numeric(plan, value, element_type) if plan else None
+		if index == -1:
+			return value
+
+		# numpy yields its own scalars (which aren't a int for Int) and memoryview single bytes in python 2,
+		# tolist converts them to python objects
+		elements = value.tolist()
+		if index is not None:
+			return self._locate(self.definition._check(elements[index]))
+
+		result, changed = [], False
+		check = self.definition._check
+		for e in elements:
+			checked = check(e)
+			if isinstance(checked, Invalid):
+				return self._locate(checked)
+			changed = changed or checked is not e
+			result.append(checked)
+		return result if changed else value
+
+	def _compile(self, compiler, source, target):
+		if self.numeric_plan or not self.copy or self._any_below('_is_batched'):
+			return Token._compile(self, compiler, source, target)
+		compiler.emit("if {} is None or not isinstance({}, list):".format(source, source))
+		with compiler.block(): # Buffers and errors
+			compiler.emit("{} = {}._check({})".format(target, compiler.const(self), source))
+			compiler.emit("if isinstance({}, Invalid):".format(target))
+			with compiler.block():
+				compiler.fail(self, source, target)
+		compiler.emit("else:")
+		with compiler.block():
+			element, append = compiler.name("e"), compiler.name("append")
+			compiler.emit("{} = []".format(target))
+			compiler.emit("{} = {}.append".format(append, target))
+			compiler.emit("for {} in {}:".format(element, source))
+			with compiler.block():
+				compiler.emit("{}({})".format(append, compiler.inline(self.definition, element, self)))
+
+	def _lazy(self, value):
+		""" Return a `LazyList` validating the elements of the list `value` on access. Buffers are checked at once """
+		if not isinstance(value, list):
+			return self._check(value)
+		return LazyList(self, value)
+
+	def _recheck(self, previous, result, value):
+		""" Like `_check`, but reuse the results of elements equal to the ones at the same index in `previous` """
+		if value is previous:
+			return result
+		elif not (isinstance(value, list) and isinstance(previous, list) and isinstance(result, list) and len(previous) == len(result)):
+			return self._check(value)
+
+		checked, changed = [], len(value) != len(result)
+		for index, element in enumerate(value):
+			if index < len(previous):
+				element = self.definition._recheck(previous[index], result[index], element)
+				changed = changed or element is not result[index]
+			else:
+				element = self.definition._check(element)
+			if isinstance(element, Invalid):
+				return self._locate(element)
+			checked.append(element)
+		return checked if changed else result
+
+	def validate_json_array(self, stream, on_error="raise", compiled=False, chunksize=65536):
+		"""
+		Read a json-array from `stream` (a text- or binary-file) and yield the validated elements one after
+		another, while the array is parsed. Only one element is kept in memory, not the whole list.
+		`on_error` and `compiled` work as in `validate_many`.
+		"""
+		from dataschema.stream import iter_json_array
+		return self.definition.validate_many(iter_json_array(stream, chunksize), on_error, compiled)
 
 	def set_path(self, parent_path):
 		super(List, self).set_path(parent_path)
-		self.definition.set_path(self.path)
+		self.definition.set_parent(self)
+
+	def children(self):
+		return [self.definition]
 
 
 	def __add__(self, other):
@@ -350,3 +1378,78 @@ class List(ContainerToken):
 
 	def __repr__(self):
 		return "<list path={path}>\n".format(self.path) + repr(self.definition) + "\n</list>"
+
+
+
+
+class Ref(ContainerToken):
+	"""
+	A reference to a token, which is defined later. This allows recursive schemas, like trees:
+
+	node = ds.Ref("Node")
+	node.define({"name": str, "children": [node]})
+
+	The defined token keeps its own path (starting with the name of the Ref), so the paths don't
+	repeat for each level. Validating a Ref checks the containers below with an explicit stack (see
+	`dataschema.engine`), so deep data doesn't hit the recursion limit.
+	"""
+
+	def __init__(self, name=None, definition=_missing, desc=None):
+		super(Ref, self).__init__(desc=desc)
+		self.name = name or u"Ref"
+		self.token = None
+		self.set_path(None)
+		if definition is not _missing:
+			self.define(definition)
+
+	def define(self, definition):
+		""" Set the token referenced, which may contain this Ref. Returns the Ref """
+		if self.token is not None:
+			raise SchemaError(u"Ref {} is already defined".format(self.name))
+		self.token = self.get_token(definition)
+		self.token.set_path(self.name) # Not linked to the Ref, the path would contain itself
+		return self
+
+	def children(self):
+		return [self.token] if self.token is not None else []
+
+	def _target(self):
+		if self.token is None:
+			raise SchemaError(u"Ref {} is validated, but was never defined".format(self.name))
+		return self.token
+
+	def _check(self, values):
+		return self._locate(run(self._target(), values))
+
+	def _steps(self, values):
+		return self._iter_steps(values)
+
+	def _iter_steps(self, values):
+		checked = yield (self._target(), values)
+		yield Done(self._locate(checked))
+
+	def _collect_steps(self, values, errors):
+		checked = yield (self._target(), values)
+		yield Done(self._locate(checked))
+
+	def _merge(self, layers):
+		return self._locate(self._target()._merge(layers))
+
+	def _lazy(self, values):
+		return self._locate(self._target()._lazy(values))
+
+	def _acheck(self, values, limit):
+		if not self._uses_async():
+			return self._check(values)
+		from dataschema.aio import then
+		return then(self._target()._acheck(values, limit), self._locate)
+
+	def _prefetch(self, values):
+		self._target()._prefetch(values)
+
+	def as_json(self, **kwargs):
+		# The defined token isn't included, it may contain the Ref itself
+		return super(Ref, self).as_json(name=self.name, **kwargs)
+
+	def __repr__(self):
+		return u"<Ref {}>".format(self.name)
@@ -6,7 +6,7 @@ if the type is actually correct
 
 from dataschema.base import Token
 from dataschema.tokens.values import String
-from dataschema.exceptions import ValidationError
+from dataschema.exceptions import ValidationError, Invalid
 
 
 __all__ = ['asDecimal']
@@ -18,12 +18,18 @@ class asDecimal(String):
 	def __init__(self, *args, **kwargs):
 		super(asDecimal, self).__init__(*args, **kwargs)
 
-	def _validate(self, value, default=None, has_default=False):
+	def _check(self, value):
 		import decimal
-		value = super(asDecimal, self).validate(value)
+		value = super(asDecimal, self)._check(value)
+		if isinstance(value, Invalid):
+			return value
 
 		try:
 			return decimal.Decimal(value)
 		except decimal.InvalidOperation:
-			raise ValidationError(self.msg or u"{} is no decimal! (Path: {})".format(value, self.path))
+			return Invalid(self, value, u"{1} is no decimal! (Path: {0})", value)
+
+	def _compile(self, compiler, source, target):
+		# The conversion can't be inlined like the checks of String, so just call _check
+		Token._compile(self, compiler, source, target)
 
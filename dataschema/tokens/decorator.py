@@ -3,8 +3,12 @@ This file contains a list of tokens, that can be used to check
 a value for more specific things or convert them 
 """
 
-from dataschema.base import Token
-from dataschema.exceptions import ValidationError, SchemaError
+import inspect
+import os
+import stat
+
+from dataschema.base import Token, _missing
+from dataschema.exceptions import ValidationError, SchemaError, Invalid
 
 
 __all__ = ["Call", "Check", "Range", "Min", "Max", "NotEmpty", "Regex", "IsPath"]
@@ -21,12 +25,13 @@ class DecoratorToken(Token):
 	and an error-message, which will be passed on.
 	"""
 
-	def __init__(self, msg=None, desc=None):
+	def __init__(self, msg=None, desc=None, cache=None):
 		"""
 		:param msg: A userdefined error message if a ValidationError occurs within the Decorator
 		:param desc: The description of the DecoratorToken. Defaults to None
+		:param cache: Cache the results for hashable values (see `Token`)
 		"""
-		super(DecoratorToken, self).__init__(msg=msg, desc=desc)
+		super(DecoratorToken, self).__init__(msg=msg, desc=desc, cache=cache)
 		self.set_path(None)
 	
 	def set_path(self, parent_path):
@@ -35,6 +40,9 @@ class DecoratorToken(Token):
 	def as_json(self, **kwargs):
 		super(DecoratorToken, self).as_json(**kwargs)
 
+	def _is_check(self):
+		return True
+
 	def __repr__(self):
 		return u"<DecoratorToken {}>".format(self.path)
 
@@ -51,18 +59,75 @@ class Call(DecoratorToken):
 	""" Call takes a callable and calls it with the 
 	value specified in validate. The return-value of the 
 	call is instead returned
+
+	Functions registered with `Call.register` are pickled by their name, so schemas using
+	lambdas or local functions can still be send to other processes (see `validate_parallel`).
+
+	Coroutine functions (`async def`) are awaited, but can only be used with `avalidate`.
 	"""
 
-	def __init__(self, func, msg=None, desc=None):
-		super(Call, self).__init__(msg=msg, desc=desc)
-		self.func = func
+	# name -> function, filled by `register`
+	registry = {}
 
-	def _validate(self, values, default=None, has_default=False):
+	@classmethod
+	def register(cls, func, name=None):
+		"""
+		Register `func` under `name` (defaults to module and name of the function). Can be used
+		as decorator. The function must be registered in every process using the schema, which is
+		the case if the registration happens while importing the module defining the schema.
+		"""
+		name = name or u"{}.{}".format(func.__module__, func.__name__)
+		if Call.registry.get(name, func) is not func:
+			raise SchemaError(u"Another function is already registered as `{}`".format(name))
+		Call.registry[name] = func
+		return func
+
+	def __init__(self, func, msg=None, desc=None, cache=None):
+		super(Call, self).__init__(msg=msg, desc=desc, cache=cache)
+		self.func = func
+		self.coroutine = _iscoroutinefunction(func)
+
+	def __getstate__(self):
+		state = super(Call, self).__getstate__()
+		for name, func in Call.registry.items():
+			if func is self.func:
+				state['func'] = name
+				state['registered'] = True
+				break
+		return state
+
+	def __setstate__(self, state):
+		if state.pop('registered', False):
+			if not state['func'] in Call.registry:
+				raise SchemaError(u"Function `{}` used by Call is not registered in this process".format(state['func']))
+			state['func'] = Call.registry[state['func']]
+		super(Call, self).__setstate__(state)
+
+	def _check(self, values):
+		if self.coroutine:
+			return Invalid(self, values, u"Call {} uses the coroutine function {}, which needs avalidate", self.func)
 		try:
 			func = self.func
 			return func(values)
 		except Exception as e:
-			raise ValidationError(self.msg or u"Call {} raised an exception while calling {}: {}".format(self.path, self.func, e.message))
+			return Invalid(self, values, u"Call {} raised an exception while calling {}: {}", self.func, getattr(e, "message", e))
+
+	def _is_async(self):
+		return self.coroutine
+
+	def _is_check(self):
+		return False
+
+	def _acheck(self, values, limit):
+		if not self._is_async():
+			return self._check(values)
+		return self._acall(values, limit)
+
+	def _acall(self, values, limit):
+		""" Start the asynchronous function and return the coroutine of its result or an Invalid, if it raised an exception """
+		from dataschema.aio import call, then
+		return then(call(self.func, values, limit), lambda result: result,
+			lambda e: Invalid(self, values, u"Call {} raised an exception while calling {}: {}", self.func, e))
 
 
 
@@ -72,24 +137,123 @@ class Check(Call):
 	a validationerror is raised
 	"""
 
-	def _validate(self, values, default=None, has_default=False):
-		check = super(Check, self)._validate(values)
+	def _check(self, values):
+		check = super(Check, self)._check(values)
+		if isinstance(check, Invalid):
+			return check
 		if not check:
-			raise ValidationError(self.msg or u"Check {} returned False!".format(self.path))
+			return Invalid(self, values, u"Check {} returned False!")
 		return values
 
+	def _is_check(self):
+		return True
+
+	def _acheck(self, values, limit):
+		if not self._is_async():
+			return self._check(values)
+		from dataschema.aio import then
+		return then(self._acall(values, limit), lambda check:
+			check if isinstance(check, Invalid) else values if check else Invalid(self, values, u"Check {} returned False!"))
+
 
 class IsPath(Check):
-	""" Check if the string given to the validate-function is an actuall system-path """
-	def __init__(self, msg=None, desc=None):
-		import os
-		super(IsPath, self).__init__(os.path.exists, msg=msg, desc=desc)
+	"""
+	Check if the string given to the validate-function is an actuall system-path. With `file`, `dir` or
+	`readable` the path must also be a regular file, a directory or readable by this process.
+
+	With `stat_cache` (a `dataschema.cache.Cache`) the results of `os.stat` are kept, so paths repeating in a
+	document are only looked up once. The paths are the keys, so relative paths are only cached correctly, while
+	the working directory doesn't change. With a cache, the paths of a list (also within the dicts of a list) are
+	looked up by `threads` threads at once, before they are checked. With `avalidate` the filesystem is checked
+	in a thread, so the event loop isn't blocked.
+	"""
+
+	func = None # The path is checked by `_lookup`
+	coroutine = False
+
+	def __init__(self, msg=None, desc=None, file=False, dir=False, readable=False, stat_cache=None, threads=16):
+		DecoratorToken.__init__(self, msg=msg, desc=desc)
+		self.file = file
+		self.dir = dir
+		self.readable = readable
+		self.stat_cache = stat_cache
+		self.threads = threads
+
+	def _check(self, values):
+		info = self._lookup(values)
+		if info is None:
+			return Invalid(self, values, u"IsPath returned false for path `{1}`", values)
+		mode, readable = info
+		if self.file and not stat.S_ISREG(mode):
+			return Invalid(self, values, u"IsPath {}: `{}` is not a file", values)
+		if self.dir and not stat.S_ISDIR(mode):
+			return Invalid(self, values, u"IsPath {}: `{}` is not a directory", values)
+		if self.readable and not readable:
+			return Invalid(self, values, u"IsPath {}: `{}` is not readable", values)
+		return values
+
+	def _lookup(self, path):
+		""" Return `(mode, readable)` for `path` or None, if it doesn't exist. Taken from the `stat_cache`, if possible """
+		if isinstance(path, int): # os.stat takes file-descriptors, too
+			return None
+		cache = self.stat_cache
+		if cache is not None:
+			try:
+				info = cache.get(path, _missing)
+			except TypeError: # Not hashable, so not a path anyway
+				cache = None
+			else:
+				if info is not _missing and (info is None or info[1] is not None or not self.readable):
+					return info
+
+		try:
+			mode = os.stat(path).st_mode
+		except (OSError, TypeError, ValueError):
+			info = None
+		else: # Access is only checked, if needed. None means unknown
+			info = (mode, os.access(path, os.R_OK) if self.readable else None)
+		if cache is not None:
+			cache.set(path, info)
+		return info
+
+	def _is_batched(self):
+		return self.stat_cache is not None and self.threads > 1
+
+	def _prefetch(self, values):
+		""" Look up the paths in `values`, which are not cached yet, in `threads` threads at once """
+		if not self._is_batched():
+			return
+		missing = set()
+		for path in values:
+			try:
+				if self.stat_cache.get(path, _missing) is _missing:
+					missing.add(path)
+			except TypeError:
+				pass
+		if len(missing) < 2:
+			return
 
-	def _validate(self, values, default=None, has_default=False):
 		try:
-			return super(IsPath, self)._validate(values)
-		except ValidationError:
-			raise ValidationError(self.msg or u"IsPath returned false for path `{}`".format(values))
+			from concurrent.futures import ThreadPoolExecutor
+		except ImportError: # Python 2 without the futures backport
+			from multiprocessing.pool import ThreadPool
+			pool = ThreadPool(min(self.threads, len(missing)))
+			try:
+				pool.map(self._lookup, list(missing))
+			finally:
+				pool.close()
+				pool.join()
+			return
+		# A pool per call is never shared with (or left open in) forked processes
+		with ThreadPoolExecutor(min(self.threads, len(missing))) as pool:
+			list(pool.map(self._lookup, missing))
+
+	def _is_async(self):
+		return True
+
+	def _acheck(self, values, limit):
+		from dataschema.aio import call_in_thread
+		return call_in_thread(self._check, values, limit)
 
 
 class Range(DecoratorToken):
@@ -101,14 +265,26 @@ class Range(DecoratorToken):
 		self.min = min
 		self.max = max
 
-	def _validate(self, value):
-		if value != None:
-			if self.min != None and value < self.min:
-				raise ValidationError(self.msg or u"Range {}: Value {} < Min {}".format(self.path, value, self.min))
-			if self.max != None and value > self.max:
-				raise ValidationError(self.msg or u"Range {}: Value {} > Max {}".format(self.path, value, self.max))
+	def _check(self, value):
+		if value is not None:
+			if self.min is not None and value < self.min:
+				return Invalid(self, value, u"Range {}: Value {} < Min {}", value, self.min)
+			if self.max is not None and value > self.max:
+				return Invalid(self, value, u"Range {}: Value {} > Max {}", value, self.max)
 		return value
 
+	def _compile(self, compiler, source, target):
+		checks = []
+		if self.min is not None:
+			checks.append("{} < {}".format(source, compiler.const(self.min)))
+		if self.max is not None:
+			checks.append("{} > {}".format(source, compiler.const(self.max)))
+		if checks:
+			compiler.emit("if {} is not None and ({}):".format(source, " or ".join(checks)))
+			with compiler.block():
+				compiler.fail(self, source)
+		compiler.emit("{} = {}".format(target, source))
+
 
 class Min(Range):
 	""" Check a value is more than min """
@@ -128,14 +304,27 @@ class Regex(DecoratorToken):
 		super(Regex, self).__init__(**kwargs)
 		self.regex = re.compile(regex, flags)
 
-	def _validate(self, value):
+	def _check(self, value):
 		if not self.regex.match(value):
-			raise ValidationError(self.msg or u"Regex {}: Value {} did not match Regex {}".format(self.path, value, self.regex))
+			return Invalid(self, value, u"Regex {}: Value {} did not match Regex {}", value, self.regex)
 		return value
 
+	def _compile(self, compiler, source, target):
+		compiler.emit("if not {}({}):".format(compiler.const(self.regex.match), source))
+		with compiler.block():
+			compiler.fail(self, source)
+		compiler.emit("{} = {}".format(target, source))
+
 
 class NotEmpty(DecoratorToken):
-	def _validate(self, value):
+	def _check(self, value):
 		if len(value) == 0:
-			raise ValidationError(self.msg or u"{} is empty!")
-		return value
\ No newline at end of file
+			return Invalid(self, value, u"{} is empty!")
+		return value
+
+
+
+def _iscoroutinefunction(func):
+	""" True for functions defined with `async def` (python 3.5 and later) """
+	iscoroutinefunction = getattr(inspect, 'iscoroutinefunction', None)
+	return bool(iscoroutinefunction and iscoroutinefunction(func))
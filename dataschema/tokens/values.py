@@ -2,16 +2,38 @@
 This file contains all simple value tokens (like Int, String, Bool)
 """
 
-from dataschema.base import Token
-from dataschema.exceptions import ValidationError
+from dataschema.base import Token, _missing
+from dataschema.exceptions import ValidationError, Invalid
 
 import sys # Needed to check for Python 2 or 3 while handling str/unicode/strings
+import threading
 
 
 
 __all__ = ["Int", "String", "Unicode", "Bytestring", "Bool", "Object", "Decimal", "Float", 'ExplicitValue']
 
 
+_local = threading.local() # `interned` holds the table of `ValueToken.shared`, while a schema is built
+
+
+class interning(object):
+	"""
+	Used by the containers with the with-statement around building their children. Within it `ValueToken.shared`
+	shares identical value tokens. The table belongs to the outermost container, so the tokens are shared within
+	one schema, but never between schemas built one after the other.
+	"""
+
+	def __enter__(self):
+		self.outermost = getattr(_local, 'interned', None) is None
+		if self.outermost:
+			_local.interned = {}
+		return self
+
+	def __exit__(self, *args):
+		if self.outermost:
+			_local.interned = None
+
+
 
 
 class ValueToken(Token):
@@ -23,7 +45,35 @@ class ValueToken(Token):
 	:param required: If true, the Token must be given in the config (May still be None) (default: True)
 	:param desc: A string giving the Description of the Setting (Default: None)
 	:param default: A defaultvalue for the Token (Default: None
+
+	Value tokens created for basic types (e.g. {"a": int}) are shared within the schema (see `shared`), so a
+	schema with many keys of the same type doesn't hold a token for each of them.
 	"""
+
+	__slots__ = ("value_type", "required", "default", "_shared")
+
+	@classmethod
+	def shared(cls, **kwargs):
+		"""
+		Return a token of this class for `kwargs`. While a schema is built (see `interning`), all callers with the
+		same arguments get the same token, which is then marked as shared. Shared tokens are used in many places,
+		so they don't link to a parent. The containers holding them add the path to the errors instead. Outside of
+		`interning` a new token is returned.
+		"""
+		interned = getattr(_local, 'interned', None)
+		if interned is None:
+			return cls(**kwargs)
+		try: # The types are part of the key, because e.g. 1, 1.0 and True are equal
+			key = (cls, tuple(sorted((name, value.__class__, value) for name, value in kwargs.items())))
+			token = interned.get(key)
+		except TypeError: # e.g. unhashable defaults
+			return cls(**kwargs)
+		if token is None:
+			token = interned[key] = cls(**kwargs)
+		elif not token._shared: # Used a second time, so the token doesn't belong to its first parent anymore
+			token._shared = True
+			token.set_path(None)
+		return token
 	
 	def __init__(self, value_type, required=True, desc=None, default=None, msg=None):
 		"""
@@ -38,31 +88,56 @@ class ValueToken(Token):
 		self.value_type = value_type
 		self.required = required
 		self.default = default
+		self._shared = False
 
 		self.set_path(None)
 
-	def set_path(self, parent_path):
-		super(ValueToken, self).set_path(parent_path)
-		
+	def set_parent(self, parent, key=_missing):
+		if not self._shared: # Shared tokens are held by many containers, so they don't link to any of them
+			super(ValueToken, self).set_parent(parent, key)
+
 		
-	def _validate(self, value, default=None, has_default=False):
+	def _check(self, value):
 		"""
 		Validate the value. The base-methods simply checks if the value is None and if so replace it with the default. Afterwards this will
-		check if this value is required. If it is and the value is `None` a `ValidationError` is raised. Finally this will check the type of the value,
+		check if this value is required. If it is and the value is `None` an `Invalid` is returned. Finally this will check the type of the value,
 		which must match `self.value_type`
 	
 		:param value: The value to check
 		
 		:return: Returns value or default, if value is None
 		"""
-		if value == None:
+		if value is None:
 			value = self.default
-		if self.required and value == None:
-			raise ValidationError(self.msg or u"{} is required, but validated value was None!".format(self.path))
-		if value != None and not isinstance(value, self.value_type):
-			raise ValidationError(self.msg or u"{} expected {} but got {} (Value: {})".format(self.path, self.value_type, type(value), value))
+		if self.required and value is None:
+			return Invalid(self, value, u"{} is required, but validated value was None!")
+		if value is not None and not isinstance(value, self.value_type):
+			return Invalid(self, value, u"{} expected {} but got {} (Value: {})", self.value_type, type(value), value)
 		return value
 
+	def _is_static(self):
+		# Subclasses overriding _check (e.g. the converters) may return another result for None each time
+		check = type(self)._check
+		return getattr(check, '__func__', check) is ValueToken.__dict__['_check']
+
+	def _compile(self, compiler, source, target):
+		compiler.emit("if {} is None:".format(source))
+		with compiler.block():
+			if self.default is None and self.required:
+				compiler.fail(self, source)
+			elif self.default is None or isinstance(self.default, self.value_type):
+				compiler.emit("{} = {}".format(target, compiler.const(self.default)))
+			else:
+				compiler.fail(self, source)
+
+		if self.value_type is not object: # everything is an object, so no need to check
+			compiler.emit("elif not isinstance({}, {}):".format(source, compiler.const(self.value_type)))
+			with compiler.block():
+				compiler.fail(self, source)
+		compiler.emit("else:")
+		with compiler.block():
+			compiler.emit("{} = {}".format(target, source))
+
 	def __add__(self, other):
 		"""
 		Adding to ValueTokens together is a bit complicated, because of the values. The addition is as follows:
@@ -98,32 +173,45 @@ class ExplicitValue(Token):
 	This class expects a direct value and the validated value must be exactly the same
 	"""
 
-	def __init__(self, value, msg=None):
-		super(ExplicitValue, self).__init__(msg=msg)
+	def __init__(self, value, msg=None, cache=None):
+		super(ExplicitValue, self).__init__(msg=msg, cache=cache)
 		self.expected_value = value
 
-	def set_path(self, parent_path):
-		self.path = u"{} -> <Value [{}]>".format(parent_path, self.expected_value)
+	def _format_path(self, parent_path):
+		return u"{} -> <Value [{}]>".format(parent_path, self.expected_value)
 
 	def as_json(self):
 		return super(ExplicitValue, self).as_json(expected_value=self.expected_value)
 
-	def _validate(self, value, default=None, has_default=False):
+	def _check(self, value):
 		if not value == self.expected_value:
-			raise ValidationError(self.msg or u"{} expected {} but got {}".format(self.path, self.expected_value, value))
+			return Invalid(self, value, u"{} expected {} but got {}", self.expected_value, value)
 		return value
 
+	def _is_static(self):
+		return True
+
+	def _compile(self, compiler, source, target):
+		compiler.emit("if not {} == {}:".format(source, compiler.const(self.expected_value)))
+		with compiler.block():
+			compiler.fail(self, source)
+		compiler.emit("{} = {}".format(target, source))
+
 
 
 @Token.register_for(float)
 class Float(ValueToken):
 	""" For handling Floats """
+	__slots__ = ()
+
 	def __init__(self, **kwargs):
 		super(Float, self).__init__(float, **kwargs)
 
 
 class Decimal(ValueToken):
 	""" For handling decimal-types (-> 8.20) """
+	__slots__ = ()
+
 	def __init__(self, **kwargs):
 		import decimal
 		super(Decimal, self).__init__(decimal.Decimal, **kwargs)
@@ -131,6 +219,8 @@ class Decimal(ValueToken):
 
 @Token.register_for(int)
 class Int(ValueToken):
+	__slots__ = ()
+
 	def __init__(self, **kwargs):
 		super(Int, self).__init__(int, **kwargs)
 
@@ -139,11 +229,15 @@ if sys.version_info.major == 2: # In Python 2
 		
 	@Token.register_for(unicode)
 	class Unicode(ValueToken):
+		__slots__ = ()
+
 		def __init__(self, **kwargs):
 			super(Unicode, self).__init__(unicode, **kwargs)
 
 	@Token.register_for(str)
 	class Bytestring(ValueToken):
+		__slots__ = ()
+
 		def __init__(self, **kwargs):
 			super(Bytestring, self).__init__(str, **kwargs)
 
@@ -151,11 +245,15 @@ if sys.version_info.major == 2: # In Python 2
 else: # In python 3
 	@Token.register_for(str)
 	class Unicode(ValueToken):
-		def __init(self, **kwargs):
+		__slots__ = ()
+
+		def __init__(self, **kwargs):
 			super(Unicode, self).__init__(str, **kwargs)
 
 	@Token.register_for(bytes)
 	class Bytestring(ValueToken):
+		__slots__ = ()
+
 		def __init__(self, **kwargs):
 			super(Bytestring, self).__init__(bytes, **kwargs)
 
@@ -166,6 +264,8 @@ class String(ValueToken):
 	or Unicode (Python 3)
 	(So basicly a string without having to worry if python 2 or 3)
 	"""
+	__slots__ = ()
+
 	def __init__(self, **kwargs):
 		types = (unicode, str) if sys.version_info.major == 2 else (str) # IN python 3 str is unicode
 		super(String, self).__init__(types, **kwargs)
@@ -173,11 +273,15 @@ class String(ValueToken):
    
 @Token.register_for(bool)
 class Bool(ValueToken):
+	__slots__ = ()
+
 	def __init__(self, **kwargs):
 		super(Bool, self).__init__(bool, **kwargs)
 
 		
 @Token.register_for(object)
 class Object(ValueToken):
+	__slots__ = ()
+
 	def __init__(self, **kwargs):
 		super(Object, self).__init__(object, **kwargs)
\ No newline at end of file
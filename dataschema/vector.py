@@ -0,0 +1,123 @@
+"""
+This file contains the vectorized validation of numeric lists used by `List(..., vectorize=True)`.
+Instead of calling the element-token for each element, the types of all elements are collected
+at once and the bounds are checked with numpy. numpy is optional, without it (or if the elements
+can't be converted) the elements are validated one by one as usual.
+
+Buffers (array.array, memoryview and numpy-arrays) validated by a List are handled here, too. Their
+elements all have the same type, so the type is only checked once and the bounds are compared
+on a view of the buffer without copying it.
+"""
+
+import array
+
+try:
+	import numpy
+except ImportError: # numpy is optional
+	numpy = None
+
+
+# The python-type of the elements for the typecodes of array.array and the formats of memoryview
+_formats = {'?': bool}
+for code in "bBhHiIlLqQfd":
+	try:
+		_formats[code] = type(array.array(code, [0])[0])
+	except ValueError: # Not every typecode exists in each python-version
+		pass
+
+# The python-type of the elements for the kinds of numpy-dtypes
+_kinds = {'b': bool, 'i': int, 'u': int, 'f': float}
+
+
+
+def numeric_plan(token):
+	"""
+	Return `(value_type, bounds)`, if `token` is a Int, Float or Decimal either alone or in an And followed
+	by Range, Min or Max tokens. `bounds` is a list with a `(min, max)`-tuple for each range. Returns None
+	for all other tokens, because their checks can't be vectorized.
+	"""
+	from dataschema.tokens.values import Int, Float, Decimal
+	from dataschema.tokens.container import And
+	from dataschema.tokens.decorator import Range, Min, Max
+
+	tokens = token.compiled if type(token) is And else [token]
+	if not tokens or not type(tokens[0]) in (Int, Float, Decimal):
+		return None
+	if not all(type(t) in (Range, Min, Max) for t in tokens[1:]):
+		return None
+	return tokens[0].value_type, [(t.min, t.max) for t in tokens[1:]]
+
+
+def _dtype(value_type, bounds):
+	""" The dtype to compare the values in. Bounds of other types are compared with python objects, so
+	e.g. a float bound of an int-list doesn't lose precision """
+	limits = [limit for bound in bounds for limit in bound if limit is not None]
+	if value_type is int and all(type(limit) is int for limit in limits):
+		return numpy.int64
+	if value_type is float and all(type(limit) in (int, float) for limit in limits):
+		return numpy.float64
+	return object
+
+
+def is_buffer(values):
+	""" Return true, if `values` is a array.array, memoryview or numpy-array """
+	return isinstance(values, (array.array, memoryview)) or (numpy is not None and isinstance(values, numpy.ndarray))
+
+
+def buffers_equal(values, other):
+	""" Return true, if the buffers `values` and `other` of the same class have the same format, shape and
+	elements. Unlike `==` (elementwise for numpy-arrays) this always returns a bool """
+	if isinstance(values, array.array):
+		return values.typecode == other.typecode and values == other
+	elif isinstance(values, memoryview):
+		return values.format == other.format and values.shape == other.shape and values.tobytes() == other.tobytes()
+	return values.dtype == other.dtype and values.shape == other.shape and bool(numpy.array_equal(values, other))
+
+
+def buffer_type(values):
+	""" Return the python-type of the elements of the buffer `values` or None, if the format is unknown
+	or the buffer has more than one dimension """
+	if isinstance(values, array.array):
+		return _formats.get(values.typecode)
+	elif isinstance(values, memoryview):
+		return _formats.get(values.format.lstrip("@=<>!")) if values.ndim == 1 else None
+	return _kinds.get(values.dtype.kind) if values.ndim == 1 else None
+
+
+def _view(values):
+	""" A numpy-array sharing the memory of the buffer `values` """
+	if isinstance(values, array.array):
+		return numpy.frombuffer(values, values.typecode)
+	return numpy.asarray(values)
+
+
+def check_numeric(plan, values, element_type=None):
+	"""
+	Check all `values` against the `plan` of `numeric_plan` at once. Returns the index of the first invalid
+	value, -1 if all values are valid or None, if the values have to be checked one by one (numpy is not
+	installed and there are bounds, a value has the wrong type or is None, ...). For buffers the type of the elements is given
+	as `element_type` and the buffer is compared in place.
+	"""
+	value_type, bounds = plan
+	for cls in [element_type] if element_type else set(map(type, values)):
+		if not issubclass(cls, value_type):
+			return None # The usual validation reports the error or replaces None with the default
+	if not bounds or not len(values):
+		return -1
+	elif numpy is None:
+		return None
+
+	try:
+		if element_type:
+			view = _view(values)
+		else:
+			view = numpy.array(values, _dtype(value_type, bounds))
+		invalid = numpy.zeros(len(view), bool)
+		for min, max in bounds:
+			if min is not None:
+				invalid |= view < min
+			if max is not None:
+				invalid |= view > max
+	except (TypeError, ValueError, OverflowError): # e.g. ints not fitting into int64
+		return None
+	return int(numpy.argmax(invalid)) if invalid.any() else -1
@@ -0,0 +1,163 @@
+"""
+This file contains the read-only views returned as results instead of dicts and lists. Dicts created with
+`Dict.lazy_defaults` return a `DefaultsView`, which only stores the entries given in the input and
+takes all other entries from the defaults shared by all results of the schema. `Token.validate_lazy`
+returns a `LazyDict` or `LazyList`, which validate their entries on first access.
+"""
+
+try:
+	from collections.abc import Mapping, Sequence
+except ImportError: # Python 2
+	from collections import Mapping, Sequence
+
+try:
+	from types import MappingProxyType as _MappingProxy
+except ImportError: # Python 2 has no public read-only mapping, so the views get a copy
+	_MappingProxy = dict
+
+from dataschema.base import _copy_mutable, _missing
+from dataschema.exceptions import Invalid
+
+
+
+def read_only(defaults):
+	""" Return a read-only proxy of the dict `defaults` to share with `DefaultsView`s """
+	return _MappingProxy(defaults)
+
+
+
+class DefaultsView(Mapping):
+	"""
+	A read-only mapping of the entries in `values`, which falls back to the shared `defaults` for all
+	other keys. Dicts and lists taken from the defaults are copied, so changing them doesn't change the
+	other results. Use `dict(view)` to get a plain dict (e.g. for json.dumps).
+	"""
+
+	__slots__ = ("_values", "_defaults")
+
+	def __init__(self, values, defaults):
+		self._values = values
+		self._defaults = defaults
+
+	def __getitem__(self, key):
+		try:
+			return self._values[key]
+		except KeyError:
+			return _copy_mutable(self._defaults[key])
+
+	def __contains__(self, key):
+		return key in self._values or key in self._defaults
+
+	def __iter__(self):
+		values = self._values
+		for key in values:
+			yield key
+		for key in self._defaults:
+			if not key in values:
+				yield key
+
+	def __len__(self):
+		defaults = self._defaults
+		return len(self._values) + len(defaults) - sum(1 for key in self._values if key in defaults)
+
+	def __reduce__(self):
+		return (DefaultsView, (self._values, dict(self._defaults)))
+
+	def __repr__(self):
+		return u"DefaultsView({!r}, {} defaults)".format(self._values, len(self) - len(self._values))
+
+
+
+class LazyDict(Mapping):
+	"""
+	A read-only mapping of the entries of a dict, which are validated by the tokens of the `Dict`, once they are
+	accessed (see `Token.validate_lazy`). The results are kept, so each entry is validated once. Accessing an
+	invalid entry raises the ValidationError. Nested dicts and lists are returned as lazy views as well.
+	"""
+
+	__slots__ = ("_token", "_entries", "_results")
+
+	def __init__(self, token, entries):
+		self._token = token
+		self._entries = entries # key -> (location, token, item)
+		self._results = {}
+
+	def __getitem__(self, key):
+		try:
+			return self._results[key]
+		except KeyError:
+			pass
+		location, token, item = self._entries[key]
+		checked = token._lazy(item)
+		if isinstance(checked, Invalid):
+			raise self._token._locate(checked, location).error()
+		self._results[key] = checked
+		return checked
+
+	def __contains__(self, key):
+		return key in self._entries
+
+	def __iter__(self):
+		return iter(self._entries)
+
+	def __len__(self):
+		return len(self._entries)
+
+	def force(self):
+		""" Validate all entries, which weren't accessed yet, and return the result as plain dict """
+		return {key: _force(self[key]) for key in self._entries}
+
+	def __repr__(self):
+		return u"LazyDict({} of {} entries validated)".format(len(self._results), len(self._entries))
+
+
+
+class LazyList(Sequence):
+	"""
+	A read-only sequence of the elements of a list, which are validated on first access like the entries of
+	`LazyDict`. Slices are returned as plain lists of the (lazy) elements.
+	"""
+
+	__slots__ = ("_token", "_values", "_results")
+
+	def __init__(self, token, values):
+		self._token = token
+		self._values = values
+		self._results = [_missing] * len(values) # _missing marks the elements not validated yet
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(len(self._values)))]
+		checked = self._results[index]
+		if checked is _missing:
+			checked = self._token.definition._lazy(self._values[index])
+			if isinstance(checked, Invalid):
+				raise self._token._locate(checked).error()
+			self._results[index] = checked
+		return checked
+
+	def __len__(self):
+		return len(self._values)
+
+	def __eq__(self, other):
+		if not isinstance(other, (list, LazyList)):
+			return NotImplemented
+		return len(self) == len(other) and list(self) == list(other)
+
+	def __ne__(self, other):
+		equal = self.__eq__(other)
+		return equal if equal is NotImplemented else not equal
+
+	__hash__ = None
+
+	def force(self):
+		""" Validate all elements, which weren't accessed yet, and return the result as plain list """
+		return [_force(self[index]) for index in range(len(self._values))]
+
+	def __repr__(self):
+		validated = sum(1 for checked in self._results if checked is not _missing)
+		return u"LazyList({} of {} elements validated)".format(validated, len(self._values))
+
+
+def _force(value):
+	return value.force() if isinstance(value, (LazyDict, LazyList)) else value
@@ -3,4 +3,12 @@ from .basics import *
 from .valuetokens import *
 from .decoratortokens import *
 from .containertokens import *
-from .convertertokens import *
\ No newline at end of file
+from .convertertokens import *
+from .compiler import *
+from .parallel import *
+from .stream import *
+from .cache import *
+from .vector import *
+from .profiling import *
+from .aio import *
+from .reload import *
\ No newline at end of file
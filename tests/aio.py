@@ -0,0 +1,139 @@
+from .testcase import TestCase
+import dataschema as ds
+import gc
+import sys
+import unittest
+import time
+import warnings
+
+try:
+	import asyncio
+except ImportError: # Python 2
+	asyncio = None
+
+
+# The coroutine functions are defined with exec, so this file can still be compiled by python 2
+functions = {}
+cancelled = []
+if asyncio is not None:
+	exec("""
+async def is_unique(value):
+	await asyncio.sleep(0.05)
+	return value != "taken"
+
+async def upper(value):
+	await asyncio.sleep(0.05)
+	return value.upper()
+
+async def fails(value):
+	raise KeyError(value)
+
+async def slow(value):
+	try:
+		await asyncio.sleep(1)
+	except asyncio.CancelledError:
+		cancelled.append(value)
+		raise
+	return value
+
+async def validate(token, values, kwargs):
+	return await token.avalidate(values, **kwargs)
+""", {'asyncio': asyncio, 'cancelled': cancelled}, functions)
+
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class AsyncValidationTests(TestCase):
+
+	def run_async(self, schema, values, **kwargs):
+		token = ds.Token.get_token(schema)
+		loop = asyncio.new_event_loop()
+		try:
+			return loop.run_until_complete(functions['validate'](token, values, kwargs))
+		finally:
+			loop.close()
+
+	def test_sync_schemas(self):
+		self.assertEqual(self.run_async({"a": int, "b": [str]}, {"a": 1, "b": ["x"]}), {"a": 1, "b": ["x"]})
+		with self.assertRaises(ds.ValidationError):
+			self.run_async({"a": int}, {"a": "x"})
+
+	def test_call_and_check(self):
+		schema = ds.And(str, ds.Check(functions['is_unique']), ds.Call(functions['upper']))
+		self.assertEqual(self.run_async(schema, "name"), "NAME")
+		with self.assertRaises(ds.ValidationError):
+			self.run_async(schema, "taken")
+		with self.assertRaises(ds.ValidationError):
+			self.run_async(ds.Call(functions['fails']), 1)
+		self.assertEqual(self.run_async(ds.Or(ds.Check(functions['is_unique']), int), 1), 1)
+
+	def test_asyncio_run(self):
+		schema = ds.Token.get_token([ds.Call(functions['upper'])])
+		self.assertEqual(asyncio.run(schema.avalidate(["a", "b"])), ["A", "B"])
+		self.assertEqual(asyncio.run(schema.avalidate(["a"], concurrency=1)), ["A"])
+
+	def test_failure_cancels_siblings(self):
+		del cancelled[:]
+		start = time.time()
+		with self.assertRaises(ds.ValidationError):
+			self.run_async({"a": ds.Call(functions['slow']), "b": ds.Check(functions['is_unique'])}, {"a": 1, "b": "taken"})
+		with self.assertRaises(ds.ValidationError): # Failed right away, the other check isn't even started
+			self.run_async({"a": ds.Call(functions['slow']), "b": int}, {"a": 2, "b": "x"})
+		self.assertLess(time.time() - start, 0.5)
+		self.assertEqual(cancelled, [1])
+
+		with warnings.catch_warnings(record=True) as caught: # The checks of "a" are never created
+			warnings.simplefilter("always")
+			with self.assertRaises(ds.ValidationError):
+				self.run_async({"a": ds.And(ds.Call(functions['upper']), {"x": ds.Call(functions['slow'])}), "b": int}, {"a": 3, "b": "x"})
+			gc.collect()
+		self.assertEqual([str(warning.message) for warning in caught], [])
+
+	def test_coroutine_needs_avalidate(self):
+		self.assertFails(ds.Check(functions['is_unique']), "name")
+
+	def test_concurrent_children(self):
+		schema = {"a": ds.Check(functions['is_unique']), "b": [ds.Check(functions['is_unique'])], str: ds.Call(functions['upper'])}
+		value = {"a": "x", "b": ["y", "z"], "c": "d"}
+		start = time.time()
+		self.assertEqual(self.run_async(schema, value), {"a": "x", "b": ["y", "z"], "c": "D"})
+		self.assertLess(time.time() - start, 0.15)
+
+		start = time.time()
+		self.assertEqual(self.run_async(schema, value, concurrency=1), {"a": "x", "b": ["y", "z"], "c": "D"})
+		self.assertGreaterEqual(time.time() - start, 0.2)
+
+		with self.assertRaises(ds.ValidationError) as cm:
+			self.run_async(schema, {"a": "x", "b": ["y", "taken"], "c": "d"})
+		self.assertIn("Dict:b -> List -> Check", str(cm.exception))
+
+	def test_dict_without_copy(self):
+		value = {"a": "x", "b": 1}
+		schema = {"a": ds.Check(functions['is_unique']), "b": int, ds.Dict.copy: False}
+		self.assertIs(self.run_async(schema, value), value)
+
+	def test_deep_data(self):
+		node = ds.Ref("Node")
+		node.define({"value": int, "next": node, ds.Dict.required: False})
+		data = None
+		for i in range(10 * sys.getrecursionlimit()):
+			data = {"value": i, "next": data}
+		self.assertEqual(self.run_async(node, data)["value"], data["value"]) # Without asynchronous functions
+
+		# The children of asynchronous containers are checked in their own tasks, not recursively
+		node = ds.Ref("Node")
+		node.define({"value": ds.Check(functions['is_unique']), "next": node, ds.Dict.required: False})
+		data = None
+		for i in range(2 * sys.getrecursionlimit()):
+			data = {"value": i, "next": data}
+		self.assertEqual(self.run_async(node, data)["value"], data["value"])
+		data = {"value": "taken", "next": data}
+		for i in range(sys.getrecursionlimit()):
+			data = {"value": i, "next": data}
+		with self.assertRaises(ds.ValidationError):
+			self.run_async(node, data)
+
+	def test_is_path(self):
+		self.assertEqual(self.run_async([ds.IsPath()], ["."]), ["."])
+		with self.assertRaises(ds.ValidationError):
+			self.run_async(ds.IsPath(), "/does/not/exist")
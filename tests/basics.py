@@ -1,5 +1,6 @@
 from .testcase import TestCase
 import dataschema as ds
+from dataschema.tokens.values import interning
 
 class DataSchemaBasicsTests(TestCase):
 	"""
@@ -30,6 +31,75 @@ class DataSchemaBasicsTests(TestCase):
 		self.assertEquals(output, {"a": 1, "b": True, "c": 2})
 			
 
+	def test_paths(self):
+		inner = ds.Dict({"b": [ds.Int()], "c": 1})
+		self.assertEqual(inner.compiled_valuekeys["b"].definition.path, u"Dict:b -> List -> Int")
+
+		cs = ds.Dict({"a": ds.Or(inner, bool)})
+		self.assertEqual(inner.compiled_valuekeys["b"].definition.path, u"Dict:a -> Or -> Dict:b -> List -> Int")
+		self.assertEqual(inner.compiled_valuekeys["c"].path, u"Dict:a -> Or -> Dict:c -> <Value [1]>")
+
+		cs.set_path("root")
+		self.assertEqual(inner.path, u"root -> Dict:a -> Or -> Dict")
+		self.assertFails(cs, {"a": None}, u"Or-Token root -> Dict:a -> Or found no child-token that validates the input `None`")
+
+	def test_shared_value_tokens(self):
+		cs = ds.Dict({"a": int, "b": [int], "c": {str: int}})
+		shared = cs.compiled_valuekeys["a"]
+		self.assertIs(cs.compiled_valuekeys["b"].definition, shared)
+		self.assertFalse(hasattr(shared, "__dict__"))
+		with interning():
+			self.assertIs(ds.Int.shared(default=1), ds.Int.shared(default=1))
+			self.assertIsNot(ds.Int.shared(default=1), ds.Int.shared(default=True)) # 1 == True, but not the same default
+			self.assertIs(ds.Int.shared(default=True).default, True)
+
+		# Tokens are only shared within one schema
+		self.assertIsNot(ds.Dict({"a": int}).compiled_valuekeys["a"], shared)
+		self.assertIsNot(ds.Int.shared(default=1), ds.Int.shared(default=1))
+		token = ds.Token.get_token(int)
+		token.set_path("X")
+		self.assertEqual(token.path, u"X -> Int")
+
+		# The path of the errors is taken from the containers
+		for validate in (cs.validate, cs.compile()):
+			for data, path in [
+					({"a": "x", "b": [], "c": {}}, u"Dict:a -> Int"),
+					({"a": 1, "b": [1, "x"], "c": {}}, u"Dict:b -> List -> Int"),
+					({"a": 1, "b": [], "c": {"k": "x"}}, u"Dict:c -> Dict:<Dict.TypeKey str> -> Int")]:
+				with self.assertRaises(ds.ValidationError) as e:
+					validate(data)
+				self.assertTrue(e.exception.message.startswith(path + u" expected"), e.exception.message)
+
+	def test_compiled_failures_call_functions_once(self):
+		calls = []
+		def check(value):
+			calls.append(value)
+			raise ValueError("invalid")
+		cs = ds.Dict({"a": int, "b": [ds.Call(check)]})
+		for validate in (cs.validate, cs.compile()):
+			del calls[:]
+			self.assertRaises(ds.ValidationError, validate, {"a": 1, "b": ["x"]})
+			self.assertEqual(calls, ["x"])
+
+	def test_custom_token_overriding_validate(self):
+		class Even(ds.Int):
+			def _validate(self, value, default=None, has_default=False):
+				value = super(Even, self)._validate(value)
+				if value % 2:
+					raise ds.ValidationError(u"{} expected an even number".format(self.path))
+				return value
+
+		class Upper(ds.Regex):
+			def _validate(self, value, default=None, has_default=False):
+				return super(Upper, self)._validate(value).upper()
+
+		cs = ds.Dict({"a": Even(), "b": [ds.Or(Even(), ds.And(str, Upper("^x", 0)))]})
+		for validate in (cs.validate, cs.compile()):
+			self.assertEqual(validate({"a": 2, "b": [4, "xy"]}), {"a": 2, "b": [4, "XY"]})
+			for data in ({"a": 3, "b": []}, {"a": "x", "b": []}, {"a": 2, "b": [5]}):
+				self.assertRaises(ds.ValidationError, validate, data)
+		self.assertEqual([error.message for error in cs.errors({"a": 3, "b": []})], [u"Dict:a -> Even expected an even number"])
+
 	def test_as_json_is_correct(self):
 		cs = ds.Dict({
 			"a": {
@@ -56,6 +126,59 @@ class DataSchemaBasicsTests(TestCase):
 		self.assertEqual(json['a']['aa']['path'], "Dict:a -> Dict:aa -> Int")
 
 
+	def test_validate_many(self):
+		cs = ds.Dict({"a": int, "b": ds.Int(default=2)})
+		data = [{"a": 1}, {"a": "x"}, {"a": 3, "b": 4}]
+
+		results = list(cs.validate_many(data, on_error="yield"))
+		self.assertEqual(results[0], {"a": 1, "b": 2})
+		self.assertIsInstance(results[1], ds.ItemError)
+		self.assertEqual(results[1].index, 1)
+		self.assertIs(results[1].value, data[1])
+		self.assertEqual(results[2], {"a": 3, "b": 4})
+
+		self.assertEqual(list(cs.validate_many(data, on_error="skip", compiled=True)), [{"a": 1, "b": 2}, {"a": 3, "b": 4}])
+		self.assertEqual(list(cs.validate_many(data, on_error=lambda e: e.index)), [{"a": 1, "b": 2}, 1, {"a": 3, "b": 4}])
+
+		results = cs.validate_many(data)
+		self.assertEqual(next(results), {"a": 1, "b": 2})
+		with self.assertRaises(ds.ValidationError):
+			next(results)
+
+		with self.assertRaises(ValueError):
+			cs.validate_many(data, on_error="ignore")
+
+	def test_revalidate(self):
+		checked = []
+		def check(value):
+			checked.append(value)
+			return True
+
+		cs = ds.Dict({
+			"a": ds.Check(check),
+			"b": {"c": ds.Check(check), "d": ds.Int(default=1)},
+			"e": [ds.Check(check)],
+			str: ds.Check(check),
+		})
+		previous = {"a": 1, "b": {"c": 2}, "e": [3, 4], "x": 5}
+		result = cs.validate(previous)
+
+		# equal data is taken from the result of the previous validation
+		del checked[:]
+		self.assertIs(cs.revalidate(previous, result, {"a": 1, "b": {"c": 2}, "e": [3, 4], "x": 5}), result)
+		self.assertEqual(checked, [])
+
+		# only the changed values are validated again
+		new = cs.revalidate(previous, result, {"a": 1, "b": {"c": 2, "d": 3}, "e": [3, 6], "y": 7})
+		self.assertEqual(new, {"a": 1, "b": {"c": 2, "d": 3}, "e": [3, 6], "y": 7})
+		self.assertEqual(sorted(checked), [6, 7])
+		self.assertIsNot(new["b"], result["b"])
+
+		with self.assertRaises(ds.ValidationError):
+			cs.revalidate(previous, result, {"a": 1, "b": {"c": 2, "d": "x"}, "e": [3, 4]})
+		with self.assertRaises(ds.ValidationError):
+			cs.revalidate(previous, result, {"a": 1, "b": {"c": 2}, "e": [3, 4], 1: 2})
+
 	def test_message_parameter(self):
 		self.assertFails(ds.Int(msg="Test"), "no-int", "Test")
 		self.assertFails(ds.Int(), "no-int", "Int expected <type 'int'> but got <type 'str'> (Value: no-int)")
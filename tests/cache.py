@@ -0,0 +1,83 @@
+from .testcase import TestCase
+import dataschema as ds
+from dataschema.cache import Cache
+import pickle
+
+
+class frozendict(dict):
+	def __hash__(self):
+		return hash(frozenset(self.items()))
+
+
+class CacheTests(TestCase):
+
+	def test_lru(self):
+		cache = Cache(2)
+		cache.set("a", 1)
+		cache.set("b", 2)
+		self.assertEqual(cache.get("a"), 1)
+		cache.set("c", 3) # drops b, because a was used more recently
+		self.assertEqual(cache.get("b"), None)
+		self.assertEqual(cache.get("c"), 3)
+		self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 1, 2))
+
+	def test_ttl(self):
+		cache = Cache(2, ttl=60)
+		cache.set("a", 1)
+		self.assertEqual(cache.get("a"), 1)
+		cache.ttl = -1 # Entries set from now on are expired already
+		cache.set("b", 2)
+		self.assertEqual(cache.get("b", "missing"), "missing")
+		self.assertEqual(pickle.loads(pickle.dumps(Cache(5, ttl=3))).ttl, 3)
+
+	def test_call_results_are_cached(self):
+		calls = []
+		def convert(value):
+			calls.append(value)
+			return int(value)
+
+		cs = ds.List(ds.Call(convert, cache=10))
+		self.assertValidates(cs, ["1", "2", "1", "1"], [1, 2, 1, 1])
+		self.assertEqual(calls, ["1", "2"])
+		self.assertEqual((cs.definition.cache.hits, cs.definition.cache.misses), (2, 2))
+
+		# Failures are cached too
+		self.assertFails(cs, ["x"])
+		self.assertFails(cs, ["x"])
+		self.assertEqual(calls, ["1", "2", "x"])
+
+		# Each caller locates its own copy of the cached failure
+		cs = ds.Dict({"a": cs.definition, "b": cs.definition})
+		self.assertEqual([error.path for error in cs.errors({"a": "x", "b": "x"})], ["Dict:a -> Call", "Dict:b -> Call"])
+
+	def test_mutable_results_are_copied(self):
+		cs = ds.Call(lambda value: {"value": [value]}, cache=True)
+		first = cs.validate("a")
+		first["value"].append("b")
+		self.assertEqual(cs.validate("a"), {"value": ["a"]})
+		self.assertEqual(cs.cache.hits, 1)
+
+	def test_values_are_cached_by_class(self):
+		cs = ds.ExplicitValue(1, cache=True)
+		self.assertIs(cs.validate(1), 1)
+		self.assertIs(cs.validate(True), True)
+		self.assertEqual(cs.validate(1.0).__class__, float)
+
+	def test_unhashable_values_are_not_cached(self):
+		cs = ds.Or(ds.List(str), ds.Regex("^a", 0), cache=True)
+		self.assertValidates(cs, ["a"], ["a"])
+		self.assertValidates(cs, "a", "a")
+		self.assertEqual((cs.cache.hits, cs.cache.misses), (0, 1))
+
+	def test_shared_cache_and_dict(self):
+		cache = Cache()
+		cs = ds.Dict({"a": ds.Regex("^a", 0, cache=cache), ds.Dict.cache: cache})
+		self.assertValidates(cs, frozendict(a="a"), {"a": "a"})
+		self.assertValidates(cs, frozendict(a="a"), {"a": "a"})
+		self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+	def test_pickle_token_with_cache(self):
+		cs = pickle.loads(pickle.dumps(ds.ExplicitValue("a", cache=5)))
+		self.assertValidates(cs, "a", "a")
+		self.assertValidates(cs, "a", "a")
+		self.assertEqual((cs.cache.size, cs.cache.hits), (5, 1))
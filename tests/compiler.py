@@ -0,0 +1,74 @@
+from .testcase import TestCase
+import dataschema as ds
+
+
+class CompilerTests(TestCase):
+	"""
+	Testing the compiled validate-function returns the same as `validate`
+	"""
+
+	def assertSameResult(self, schema, data):
+		schema = ds.Token.get_token(schema)
+		validate = schema.compile()
+		try:
+			expected = schema.validate(data)
+		except ds.ValidationError as e:
+			with self.assertRaises(ds.ValidationError) as compiled:
+				validate(data)
+			self.assertEqual(e.message, compiled.exception.message)
+		else:
+			self.assertEqual(validate(data), expected)
+
+	def test_value_tokens(self):
+		for schema in [int, bool, ds.Int(default=1), ds.Int(required=False), ds.String(), ds.Object(), ds.Int(msg="Test")]:
+			for data in [1, None, "a", True, 1.5]:
+				self.assertSameResult(schema, data)
+
+	def test_explicit_value_and_decorators(self):
+		for schema in [1, "a", ds.Call(int), ds.Check(bool)]:
+			for data in [1, 2, 4, "a", "b"]:
+				self.assertSameResult(schema, data)
+		for schema in [ds.And(ds.Range(min=1, max=3)), ds.And(ds.Max(2))]: # Numbers only, python 3 can't compare str and int
+			for data in [1, 2, 4, 1.5]:
+				self.assertSameResult(schema, data)
+		for data in ["a", "ba"]:
+			self.assertSameResult(ds.And(ds.Regex("^a", 0)), data)
+
+	def test_dict(self):
+		schema = {
+			"a": int,
+			"b": ds.Bool(default=True),
+			"c": {"d": ds.String(required=False)},
+			int: ds.And(int, ds.Min(0)),
+			str: object,
+		}
+		for data in [{"a": 1, "c": {}}, {"a": 1, "c": {"d": "x"}, 1: 2, "x": None}, {"a": 1, "c": {"e": 1}},
+				{"a": 1, "c": {}, 1: -1}, {"a": 1, "c": {}, 1.5: 1}, {"c": {}}, None, []]:
+			self.assertSameResult(ds.Dict(dict(schema)), data)
+
+		self.assertSameResult({"a": int, ds.Dict.skip_unknown_keys: True}, {"a": 1, "b": 2})
+		self.assertSameResult({"a": int, ds.Dict.default: {"a": 2}}, None)
+
+	def test_list_and_or(self):
+		schema = ds.List(ds.Or(int, {"a": ds.Or(int, ds.String())}, msg=None))
+		for data in [[1, {"a": 1}, {"a": "x"}], [1, {"a": None}], [None], None, [], "a"]:
+			self.assertSameResult(schema, data)
+		self.assertSameResult(ds.Or(), 1)
+		self.assertSameResult(ds.Or(int, msg="Test"), "a")
+
+	def test_discriminated_or(self):
+		schema = ds.Or({"type": "a", "value": int}, {"type": "b", "value": ds.String()}, {"type": "b", "value": int}, int)
+		for data in [{"type": "a", "value": 1}, {"type": "b", "value": 1}, {"type": "b", "value": None},
+				{"type": "c"}, {"type": []}, {}, 1, None]:
+			self.assertSameResult(schema, data)
+		self.assertSameResult(ds.List(schema), [1, {"type": "a", "value": "x"}])
+
+	def test_deep_nesting(self):
+		schema = int
+		for i in range(30):
+			schema = ds.Or([{"a": schema}])
+		data = 1
+		for i in range(30):
+			data = [{"a": data}]
+		self.assertSameResult(schema, data)
+		self.assertSameResult(schema, [{"a": [{"a": "x"}]}])
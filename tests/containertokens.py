@@ -1,5 +1,7 @@
 from .testcase import TestCase
 import dataschema as ds
+import sys
+import pickle
 
 
 class AndTokenTests(TestCase):
@@ -81,6 +83,53 @@ class OrTokenTests(TestCase):
 		cs = ds.Or(int, ds.String(), msg="Failing test")
 		self.assertFails(cs, None, "Failing test")
 
+	def test_or_does_not_format_failing_children(self):
+		class Value(object):
+			formatted = 0
+			def __format__(self, spec):
+				Value.formatted += 1
+				return "value"
+
+		cs = ds.Or(int, {"a": int}, ds.String(), object)
+		self.assertValidates(cs, Value())
+		self.assertEqual(Value.formatted, 0)
+
+		failure = ds.Or(int)._check(Value())
+		self.assertIsInstance(failure, ds.Invalid)
+		self.assertEqual(Value.formatted, 0)
+		self.assertEqual(failure.message, "Or-Token Or found no child-token that validates the input `value`")
+
+
+	def test_or_discriminator_is_detected(self):
+		cs = ds.Or({"type": "a", "value": int}, {"type": "b", "value": ds.String()}, int)
+		self.assertEqual(cs.discriminator, "type")
+		self.assertValidates(cs, {"type": "b", "value": "x"}, {"type": "b", "value": "x"})
+		self.assertValidates(cs, 1, 1)
+		self.assertFails(cs, {"type": "c", "value": 1}, "Or-Token Or has no child for type `c`")
+		self.assertFails(cs, {"type": "a", "value": "x"},
+			"Or-Token Or found no child for type `a` that validates the input: Or -> Dict:value -> Int expected {} but got {} (Value: x)".format(int, str))
+
+		self.assertEqual(ds.Or({"type": "a"}, {"kind": "b"}).discriminator, None)
+		self.assertEqual(ds.Or({"type": "a", "x": 1}, {"type": "b", "x": 1}).discriminator, "type")
+
+	def test_or_discriminator_only_tries_matching_child(self):
+		calls = []
+		def branch(name):
+			return ds.Dict({"type": name, "value": ds.Call(lambda value: calls.append(name) or value)})
+
+		cs = ds.Or(*[branch(name) for name in "abcdef"])
+		self.assertValidates(cs, {"type": "e", "value": 1}, {"type": "e", "value": 1})
+		self.assertEqual(calls, ["e"])
+
+	def test_or_explicit_discriminator(self):
+		cs = ds.Or({"type": "a", "x": "a"}, {"type": "b", "x": "a"}, discriminator="x")
+		self.assertEqual(cs.discriminator, "x")
+		self.assertValidates(cs, {"type": "b", "x": "a"})
+		self.assertFails(cs, {"type": "b", "x": "b"})
+
+		self.assertEqual(ds.Or({"type": "a"}, {"type": "b"}, discriminator=False).discriminator, None)
+		with self.assertRaises(ds.SchemaError):
+			ds.Or({"type": "a"}, {"type": "b"}, discriminator="kind")
 
 
 class ListTokenTests(TestCase):
@@ -113,6 +162,52 @@ class ListTokenTests(TestCase):
 		cs = ds.List(ds.Int(default=10))
 		self.assertValidates(cs, [1, None, None, 2], [1, 10, 10, 2])
 
+	def test_list_without_copy(self):
+		values = [1, 2, 3]
+		self.assertIs(ds.List([int], copy=False).validate(values), values)
+		self.assertIsNot(ds.List([int]).validate(values), values)
+
+		values = [1, None, 3]
+		result = ds.List(ds.Int(default=10), copy=False).validate(values)
+		self.assertEqual(result, [1, 10, 3])
+		self.assertEqual(values, [1, None, 3])
+		self.assertFails(ds.List([int], copy=False), [1, "a"])
+
+
+class RefTokenTests(TestCase):
+
+	def test_recursive_schema(self):
+		node = ds.Ref("Node")
+		node.define({"name": ds.String(), "children": [node]})
+		tree = {"name": "a", "children": [{"name": "b", "children": []}]}
+		self.assertValidates(node, tree, tree)
+		failure = node.errors({"name": "a", "children": [{"name": 1, "children": []}]})
+		self.assertEqual([error.path for error in failure], ["Node -> Dict:name -> String"])
+		self.assertFails(node, {"name": "a", "children": [{"name": "b"}]})
+		self.assertEqual(ds.Dict({"tree": node}).compile()({"tree": tree}), {"tree": tree})
+
+	def test_deep_data(self):
+		node = ds.Ref("Node")
+		node.define({"value": int, "next": node, ds.Dict.required: False})
+		data = None
+		for i in range(10 * sys.getrecursionlimit()):
+			data = {"value": i, "next": data}
+		result = node.validate(data)
+		self.assertEqual(result["value"], data["value"])
+
+		bottom = data
+		while bottom["next"] is not None:
+			bottom = bottom["next"]
+		bottom["value"] = "x"
+		self.assertEqual([error.path for error in node.errors(data)], ["Node -> Dict:value -> Int"])
+		self.assertEqual(node.errors({"value": 1, "next": {"value": 2}}), [])
+
+	def test_undefined(self):
+		with self.assertRaises(ds.SchemaError):
+			ds.Ref().validate(1)
+		with self.assertRaises(ds.SchemaError):
+			ds.Ref(definition=int).define(str)
+
 
 class DictTokenTests(TestCase):
 		
@@ -239,6 +334,31 @@ class DictTokenTests(TestCase):
  			{1: int, int: ds.String()},
  			{1: "a", 2: u"a"})
 
+	def test_typekeys_most_specific_wins(self):
+		class A(object): pass
+		class B(A): pass
+		class C(B): pass
+		cs = ds.Dict({object: ds.String(), A: bool, B: int})
+		self.assertValidates(cs, {C(): 1, B(): 2, A(): True, 1: "a"})
+		self.assertFails(cs, {C(): "x"})
+
+		# The result for each class is cached on the dict
+		self.assertEqual(cs._typekey_cache[C].key_type, B)
+		self.assertEqual(cs._typekey_cache[int].key_type, object)
+
+	def test_typekeys_with_abstract_base_class(self):
+		import numbers
+		self.assertValidates(
+			{numbers.Number: bool, str: int},
+			{1: True, 1.5: False, "a": 1},
+			{1: True, 1.5: False, "a": 1})
+
+		# object only matches keys, which no abstract base class matches
+		cs = ds.Dict({object: ds.String(), numbers.Number: ds.Int(), numbers.Integral: bool})
+		self.assertValidates(cs, {1.5: 5, 1: True, "a": "b"})
+		self.assertEqual(cs._typekey_cache[int].key_type, numbers.Integral)
+		self.assertEqual(cs._typekey_cache[str].key_type, object)
+
  	def test_typekeys_with_dict_value(self):
  		self.assertValidates(
  			{str: {"a": int}},
@@ -258,6 +378,232 @@ class DictTokenTests(TestCase):
  		cs = ds.Dict({"a": int, ds.Dict.msg: "Test"})
  		self.assertFails(cs, None, "Test")
 
+	def test_dict_without_copy(self):
+		cs = ds.Dict({"a": int, "b": [{"c": ds.Int(default=1)}], str: bool, ds.Dict.copy: False})
+		self.assertFalse(cs.compiled_valuekeys["b"].copy) # Inline containers take over the setting
+
+		values = {"a": 1, "b": [{"c": 2}, {"c": 3}], "x": True}
+		self.assertIs(cs.validate(values), values)
+
+		values = {"a": 1, "b": [{"c": 2}, {"c": None}], "x": True}
+		result = cs.validate(values)
+		self.assertEqual(result, {"a": 1, "b": [{"c": 2}, {"c": 1}], "x": True})
+		self.assertIsNot(result, values)
+		self.assertIs(result["b"][0], values["b"][0]) # Unchanged parts are shared
+		self.assertEqual(values["b"][1], {"c": None})
+
+		self.assertFails(cs, {"a": 1, "b": [], 1: True})
+		cs = ds.Dict({"a": ds.Int(required=False), ds.Dict.copy: False, ds.Dict.skip_unknown_keys: True})
+		self.assertEqual(cs.validate({"x": 1}), {"a": None})
+		self.assertEqual(cs.compile()({"x": 1}), {"a": None})
+
+	def test_dict_missing_keys(self):
+		calls = []
+		def record(value):
+			calls.append(value)
+			return value
+		for copy in (True, False):
+			cs = ds.Dict({
+				"a": ds.Int(required=False, default=1),
+				"b": ds.String(required=False),
+				"c": ds.Call(record),
+				"d": {"e": int, ds.Dict.required: False},
+				ds.Dict.copy: copy,
+			})
+			del calls[:]
+			self.assertValidates(cs, {"b": "x"}, {"a": 1, "b": "x", "c": None, "d": None})
+			self.assertEqual(calls, [None]) # Functions are still called for missing keys
+			self.assertValidates(cs, {"a": 2, "b": "x", "c": 3, "d": {"e": 4}}, {"a": 2, "b": "x", "c": 3, "d": {"e": 4}})
+			self.assertFails(cs, {"b": 1})
+			self.assertFails(cs, {"x": 1})
+
+		cs = ds.Dict({"a": int, "b": ds.Int(required=False)})
+		self.assertFails(cs, {"b": 1}, u"Dict:a -> Int is required, but validated value was None!")
+
+	def test_dict_missing_key_of_value_token_subclass(self):
+		class Counter(ds.Int):
+			calls = 0
+			def _check(self, value):
+				Counter.calls += 1
+				return Counter.calls if value is None else super(Counter, self)._check(value)
+
+		for copy in (True, False):
+			cs = ds.Dict({"a": Counter(required=False), "b": ds.Int(required=False), ds.Dict.copy: copy})
+			self.assertNotEqual(cs.validate({})["a"], cs.validate({})["a"]) # Not frozen into the defaults
+			self.assertEqual(cs.validate({"a": 1, "b": 2}), {"a": 1, "b": 2})
+		self.assertFalse(ds.asDecimal()._is_static())
+		self.assertTrue(ds.Int()._is_static())
+
+	def test_dict_reports_first_failure_in_schema_order(self):
+		# Sets of small ints iterate in ascending order, unlike the schema
+		for copy in (True, False):
+			cs = ds.Dict({9: int, 7: int, 5: int, 3: int, 1: int, 0: ds.Int(required=False), ds.Dict.copy: copy})
+			first = [key for key in cs.compiled_valuekeys if key != 0][0]
+			message = u"Dict:{} -> Int is required, but validated value was None!".format(first)
+			self.assertFails(cs, {3: "x"}, message)
+			self.assertFails(cs, {0: 1, 3: "x"}, message)
+			with self.assertRaises(ds.ValidationError) as compiled:
+				cs.compile()({3: "x"})
+			self.assertEqual(compiled.exception.message, message)
+
+	def test_dict_lazy_defaults(self):
+		for copy in (True, False):
+			definition = {"a": ds.Int(required=False, default=1), "b": ds.String(required=False), "c": int, str: int}
+			definition.update({ds.Dict.lazy_defaults: True, ds.Dict.copy: copy})
+			cs = ds.Dict(definition)
+			result = cs.validate({"c": 2, "x": 3})
+			self.assertIsInstance(result, ds.DefaultsView)
+			self.assertEqual(result, {"a": 1, "b": None, "c": 2, "x": 3})
+			self.assertEqual(len(result), 4)
+			self.assertEqual(sorted(result), ["a", "b", "c", "x"])
+			self.assertEqual(dict(result), {"a": 1, "b": None, "c": 2, "x": 3})
+			self.assertIs(result._defaults, cs.validate({"c": 4})._defaults) # The defaults are shared
+			with self.assertRaises(TypeError):
+				result["a"] = 2
+
+			self.assertIs(type(cs.validate({"a": 2, "b": "y", "c": 3})), dict) # Nothing to take from the defaults
+			self.assertEqual(cs.merge_validate({"c": 2}, {"b": "y"}), {"a": 1, "b": "y", "c": 2})
+			self.assertFails(cs, {"a": 1})
+			self.assertEqual(cs.validate(result), result) # Views are accepted as input
+			self.assertEqual(cs.compile()(result), result)
+
+		# Mutable defaults are copied for each result
+		cs = ds.Dict({"a": ds.Object(required=False, default={"x": [1]}), "b": int, ds.Dict.lazy_defaults: True})
+		result = cs.validate({"b": 1})
+		result["a"]["x"].append(2)
+		self.assertEqual(cs.validate({"b": 2})["a"], {"x": [1]})
+		self.assertEqual(pickle.loads(pickle.dumps(result)), {"a": {"x": [1]}, "b": 1})
+		cs = pickle.loads(pickle.dumps(cs, pickle.HIGHEST_PROTOCOL))
+		self.assertEqual(cs.validate({"b": 3}), {"a": {"x": [1]}, "b": 3})
+
+		# Views are picked by the discriminator of an Or and keep lazy_defaults when dicts are added
+		lazy = {"n": ds.Int(required=False, default=1), ds.Dict.lazy_defaults: True}
+		a, b = ds.Dict(dict(lazy, type="a", x=int)), ds.Dict(dict(lazy, type="b", y=int))
+		view = a.validate({"type": "a", "x": 1})
+		self.assertIsInstance(view, ds.DefaultsView)
+		cs = ds.Or(a, b)
+		self.assertEqual(cs._candidates(view), ([a], True))
+		self.assertEqual(cs.validate(view), view)
+		self.assertEqual(cs.compile()(view), view)
+		for validate in (cs.validate, cs.compile()):
+			with self.assertRaises(ds.ValidationError) as cm:
+				validate(ds.DefaultsView({"type": "a", "x": "q"}, a._shared_defaults))
+			self.assertIn(u"found no child for type `a`", cm.exception.message)
+		added = ds.Dict({"z": ds.Int(required=False, default=2), ds.Dict.lazy_defaults: True}) + a
+		self.assertTrue(added.lazy_defaults)
+		self.assertIsInstance(added.validate({"type": "a", "x": 1}), ds.DefaultsView)
+		self.assertFalse((ds.Dict({"z": int}) + ds.Dict({"w": int})).lazy_defaults)
+
+	def test_validate_lazy(self):
+		calls = []
+		def record(value):
+			calls.append(value)
+			return value
+		cs = ds.Dict({"a": ds.Call(record), "b": [{"c": int, "d": ds.Int(required=False, default=1)}], str: int})
+		data = {"a": 1, "b": [{"c": 2}, {"c": "x"}], "e": 3}
+		result = cs.validate_lazy(data)
+		self.assertIsInstance(result, ds.LazyDict)
+		self.assertEqual(sorted(result), ["a", "b", "e"])
+		self.assertEqual(calls, []) # Nothing is validated before it is accessed
+		self.assertEqual(result["a"], 1)
+		self.assertEqual(result["a"], 1)
+		self.assertEqual(calls, [1])
+
+		self.assertIsInstance(result["b"], ds.LazyList)
+		self.assertEqual(len(result["b"]), 2)
+		self.assertEqual(result["b"][0]["d"], 1)
+		with self.assertRaises(ds.ValidationError) as cm:
+			result["b"][1]["c"]
+		self.assertIn("Dict:b -> List -> Dict:c -> Int", str(cm.exception))
+		with self.assertRaises(ds.ValidationError):
+			result.force()
+
+		data["b"][1]["c"] = 3
+		result = cs.validate_lazy(data)
+		self.assertEqual(result, cs.validate(data))
+		self.assertEqual(result.force(), cs.validate(data))
+		self.assertIs(type(result.force()["b"][0]), dict)
+
+		with self.assertRaises(ds.ValidationError):
+			cs.validate_lazy({"a": 1, "b": [], 1: 2}) # Unknown keys are found at once
+		with self.assertRaises(ds.ValidationError):
+			cs.validate_lazy([])
+		self.assertEqual(ds.Int().validate_lazy(1), 1)
+
+
+	def test_merge_validate(self):
+		cs = ds.Dict({
+			"db": {"host": ds.String(), "port": ds.Int(required=False, default=5432)},
+			"debug": ds.Bool(required=False, default=False),
+			"tags": [ds.String()],
+		})
+		defaults = {"db": {"host": "localhost"}, "tags": ["default"]}
+		site = {"db": {"port": 6543}}
+		env = {"debug": True, "db": {"host": None}} # None counts as not set
+		cli = {"tags": ["cli"]}
+		self.assertEqual(cs.merge_validate(defaults, site, None, env, cli),
+			{"db": {"host": "localhost", "port": 6543}, "debug": True, "tags": ["cli"]})
+		self.assertEqual(cs.merge_validate(defaults), cs.validate(defaults))
+		self.assertEqual(defaults, {"db": {"host": "localhost"}, "tags": ["default"]})
+
+		with self.assertRaises(ds.ValidationError):
+			cs.merge_validate(defaults, {"db": {"port": "x"}})
+		with self.assertRaises(ds.ValidationError):
+			cs.merge_validate(defaults, {"unknown": 1})
+		with self.assertRaises(ds.ValidationError):
+			cs.merge_validate(site, env)
+
+		# Like validate, the first failing key in the order of the schema is reported
+		cs = ds.Dict({6: int, 4: int, 2: int, 1: int, 3: int})
+		with self.assertRaises(ds.ValidationError) as cm:
+			cs.merge_validate({1: "x"}, {3: "y"})
+		self.assertEqual(cm.exception.message, cs.errors({1: "x", 3: "y"})[0].error().message)
+		self.assertTrue(cm.exception.message.startswith(u"Dict:{} ->".format(list(cs.compiled_valuekeys)[0])))
+
+		# The discriminator of an Or is taken from the highest layer setting it
+		cs = ds.Or({"type": "a", "x": int}, {"type": "b", "y": int})
+		self.assertEqual(cs.merge_validate({"type": "a", "x": 1}, {"x": 2}), {"type": "a", "x": 2})
+		self.assertEqual(cs.merge_validate({"type": "a"}, {"type": "b", "y": 2}), {"type": "b", "y": 2})
+
+	def test_collect_all_errors(self):
+		cs = ds.Dict({
+			"a": int,
+			"b": [ds.And(int, ds.Range(0, 5), ds.Check(lambda value: value % 2 == 0))],
+			"c": {"d": ds.String()},
+		})
+		errors = cs.errors({"a": "x", "b": [2, 7, "q"], "c": {"d": 1, "e": 2}})
+		self.assertEqual(sorted(error.path for error in errors), [
+			"Dict:a -> Int",
+			"Dict:b -> List -> And -> Check", # 7 is out of range and odd, "q" is no int
+			"Dict:b -> List -> And -> Int",
+			"Dict:b -> List -> And -> Range",
+			"Dict:c -> Dict",
+			"Dict:c -> Dict:d -> String",
+		])
+		self.assertTrue(all(isinstance(error, ds.Invalid) for error in errors))
+		self.assertEqual(len(cs.errors({"a": "x", "b": [7, 7, 7]}, max_errors=2)), 2)
+		self.assertEqual(cs.errors({"a": 1, "b": [2], "c": {"d": "x"}}), [])
+
+	def test_collect_errors_stops_before_conversions(self):
+		# Call would run on a value, which failed its precondition. Only the checks right after a failure are run
+		calls = []
+		def convert(value):
+			calls.append(value)
+			return int(value)
+		cs = ds.Dict({'n': ds.And(str, ds.Regex(r'^\d+$', 0), ds.Call(convert), ds.Min(1))})
+		self.assertEqual([error.path for error in cs.errors({'n': 'abc'})], ["Dict:n -> And -> Regex"])
+		self.assertEqual(calls, [])
+		self.assertEqual(cs.errors({'n': '0'})[0].path, "Dict:n -> And -> Min")
+
+		cs = ds.And(str, ds.Regex(r'^\d', 0), ds.Regex(r'\d$', 0), ds.Call(convert))
+		self.assertEqual([error.path for error in cs.errors('abc')], ["And -> Regex", "And -> Regex"])
+		self.assertEqual(calls, ['0'])
+
+	def test_collect_errors_of_tagged_child(self):
+		cs = ds.Or({"type": "a", "value": int}, {"type": "b", "value": str})
+		errors = cs.errors({"type": "a", "value": "x"})
+		self.assertEqual([error.path for error in errors], ["Or -> Dict:value -> Int"])
+
 
 
 
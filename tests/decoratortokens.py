@@ -1,5 +1,8 @@
 from .testcase import TestCase
 import dataschema as ds
+from dataschema.cache import Cache
+import os
+import threading
 
 class DataSchemaDecoratorTokenTests(TestCase):
 	"""
@@ -34,6 +37,43 @@ class DataSchemaDecoratorTokenTests(TestCase):
 		self.assertFails(cs, None)
 		self.assertFails(cs, 1)
 
+	def test_is_path_kinds(self):
+		directory = os.path.dirname(os.path.abspath(__file__))
+		self.assertValidates(ds.IsPath(dir=True), directory, directory)
+		self.assertFails(ds.IsPath(file=True), directory)
+		self.assertValidates(ds.IsPath(file=True, readable=True), __file__, __file__)
+		self.assertFails(ds.IsPath(dir=True), __file__)
+
+	def test_is_path_stat_cache(self):
+		cache = Cache(100, ttl=60)
+		cs = ds.List({"path": ds.IsPath(stat_cache=cache)})
+		directory = os.path.dirname(os.path.abspath(__file__))
+		paths = [{"path": directory}, {"path": __file__}, {"path": directory}]
+		self.assertValidates(cs, paths, paths)
+		self.assertEqual(len(cache), 2) # Looked up once each, in threads before checking the elements
+		self.assertFails(cs, [{"path": directory}, {"path": "/thechanceishighthisdoesnotexist"}])
+
+		uncached = ds.List(ds.IsPath())
+		self.assertIsNone(uncached.definition.stat_cache) # The cache is opt-in
+		self.assertValidates(uncached, [directory], [directory])
+
+	def test_is_path_prefetched_once(self):
+		prefetched = []
+		class CountingIsPath(ds.IsPath):
+			def _prefetch(self, values):
+				prefetched.append(list(values))
+				super(CountingIsPath, self)._prefetch(values)
+
+		directory = os.path.dirname(os.path.abspath(__file__))
+		cs = ds.List({"paths": [CountingIsPath(stat_cache=Cache(100))], str: [CountingIsPath(stat_cache=Cache(100))]})
+		data = [{"paths": [directory, __file__], "x": [directory]}, {"paths": [directory]}]
+		threads = threading.active_count()
+		for validate in (cs.validate, cs.errors):
+			del prefetched[:]
+			validate(data)
+			self.assertEqual(sorted(prefetched), [[directory], [directory, __file__, directory]])
+		self.assertEqual(threading.active_count(), threads) # The pools are shut down after prefetching
+
 	def test_not_empty(self):
 		cs = ds.NotEmpty()
 		self.assertValidates(cs, [1], [1])
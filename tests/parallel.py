@@ -0,0 +1,59 @@
+from .testcase import TestCase
+import dataschema as ds
+import pickle
+import time
+
+
+double = ds.Call.register(lambda value: value * 2, "tests.parallel.double")
+
+
+class ParallelValidationTests(TestCase):
+
+	def schema(self):
+		return ds.Dict({
+			"a": ds.And(int, ds.Call(double)),
+			"b": ds.Check(bool),
+			str: ds.Regex("^x", 0),
+		})
+
+	def test_pickle_registered_functions(self):
+		cs = pickle.loads(pickle.dumps(self.schema(), pickle.HIGHEST_PROTOCOL))
+		self.assertValidates(cs, {"a": 2, "b": 1, "c": "x"}, {"a": 4, "b": 1, "c": "x"})
+		self.assertFails(cs, {"a": 2, "b": 0})
+
+	def test_register_conflicting_name(self):
+		with self.assertRaises(ds.SchemaError):
+			ds.Call.register(lambda value: value, "tests.parallel.double")
+
+	def test_unregistered_lambda_is_schema_error(self):
+		with self.assertRaises(ds.SchemaError):
+			ds.Call(lambda value: value).validate_parallel([1])
+
+	def test_validate_parallel_keeps_order(self):
+		data = [{"a": i, "b": True} for i in range(50)]
+		data[7]["a"] = "x"
+		results = list(self.schema().validate_parallel(data, workers=2, chunksize=4, on_error="yield"))
+
+		self.assertEqual(len(results), 50)
+		self.assertEqual(results[8], {"a": 16, "b": True})
+		self.assertIsInstance(results[7], ds.ItemError)
+		self.assertEqual(results[7].index, 7)
+		self.assertIs(results[7].value, data[7])
+
+		results = list(self.schema().validate_parallel(data, workers=2, chunksize=4, on_error="skip", compiled=True))
+		self.assertEqual(len(results), 49)
+
+		with self.assertRaises(ds.ValidationError):
+			list(self.schema().validate_parallel(data, workers=2, chunksize=4))
+
+	def test_validate_parallel_reads_lazily(self):
+		read = []
+		def values():
+			for i in range(100000):
+				read.append(i)
+				yield {"a": i, "b": True}
+		results = self.schema().validate_parallel(values(), workers=2, chunksize=4)
+		self.assertEqual(next(results), {"a": 0, "b": True})
+		time.sleep(0.2)
+		self.assertLessEqual(len(read), 5 * 4) # 2 chunks per worker and the one sent after the first result
+		results.close()
@@ -0,0 +1,73 @@
+from .testcase import TestCase
+import dataschema as ds
+from dataschema.cache import Cache
+import os
+
+
+class ProfilerTests(TestCase):
+
+	def schema(self):
+		return ds.Dict({"a": ds.Or(int, ds.And(ds.String(), ds.Call(int))), "b": [bool]})
+
+	def test_walk(self):
+		shared = ds.Int()
+		cs = ds.Dict({"a": shared, "b": ds.Or(shared, bool)})
+		tokens = list(cs.walk())
+		self.assertIs(tokens[0], cs)
+		self.assertEqual(len(tokens), 4)
+
+	def test_profile(self):
+		cs = self.schema()
+		with cs.profile() as profile:
+			cs.validate({"a": "1", "b": [True, False]})
+			self.assertFails(cs, {"a": None, "b": []})
+
+		stats = profile.as_dict()
+		self.assertEqual(stats["Dict"]["calls"], 2)
+		self.assertEqual(stats["Dict"]["failures"], 1)
+		self.assertEqual(stats["Dict:b -> List -> Bool"]["calls"], 2)
+		self.assertEqual(stats["Dict:a -> Or -> Int"], dict(stats["Dict:a -> Or -> Int"], calls=2, failures=2))
+		self.assertGreaterEqual(stats["Dict"]["cumulative"], stats["Dict"]["self"])
+		self.assertIn(u"Dict:a -> Or -> And -> Call", profile.table())
+		self.assertIn(u"Dict;a -> Or;And;Call ", profile.collapsed())
+
+	def test_prefetching_containers_are_counted_once(self):
+		directory = os.path.dirname(os.path.abspath(__file__))
+		cs = ds.Dict({"a": {"b": [ds.IsPath(stat_cache=Cache(100))]}, "c": int})
+		with cs.profile() as profile:
+			cs.validate({"a": {"b": [directory, __file__]}, "c": 1})
+			self.assertFails(cs, {"a": {"b": [directory]}, "c": "x"})
+
+		stats = profile.as_dict()
+		self.assertEqual(stats["Dict"], dict(stats["Dict"], calls=2, failures=1))
+		self.assertEqual(stats["Dict:a -> Dict"]["calls"], 2)
+		self.assertEqual(stats["Dict:a -> Dict:b -> List"]["calls"], 2)
+		self.assertEqual(stats["Dict:a -> Dict:b -> List -> IsPath"]["calls"], 3)
+		self.assertEqual(stats["Dict:c -> Int"]["calls"], 2)
+		self.assertNotIn(u"Dict;Dict", profile.collapsed())
+
+	def test_disabled_profiler_is_removed(self):
+		cs = ds.Dict({"a": ds.Call(int, cache=True)})
+		profile = cs.profile()
+		profile.enable()
+		cs.validate({"a": "1"})
+		profile.disable()
+		cs.validate({"a": "1"})
+		self.assertEqual(profile.as_dict()["Dict"]["calls"], 1)
+		self.assertNotIn("_check", cs.__dict__)
+		self.assertEqual(cs.compiled_valuekeys["a"]._check, cs.compiled_valuekeys["a"]._cached_check)
+
+	def test_value_tokens(self):
+		cs = ds.Dict({"a": int, "b": [int], "c": ds.Int()})
+		other = ds.Int()
+		with cs.profile() as outer:
+			with cs.profile() as inner:
+				cs.validate({"a": 1, "b": [1, 2], "c": 3})
+				other.validate(1)
+			cs.validate({"a": 1, "b": [], "c": 3})
+		self.assertEqual(inner.as_dict()["Dict -> Int"]["calls"], 1) # a is shared with the elements of b
+		self.assertEqual(inner.as_dict()["Dict:b -> List -> Int"]["calls"], 2)
+		self.assertEqual(inner.as_dict()["Dict:c -> Int"]["calls"], 1)
+		self.assertEqual(outer.as_dict()["Dict:c -> Int"]["calls"], 2)
+		self.assertNotIn("_check", ds.Int.__dict__)
+		self.assertEqual(ds.Int._check, ds.Int.__mro__[1]._check)
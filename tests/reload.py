@@ -0,0 +1,92 @@
+from .testcase import TestCase
+import dataschema as ds
+import json
+import os
+import shutil
+import tempfile
+import time
+
+
+class ReloaderTests(TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.parsed = []
+		self.schema = ds.Dict({"port": int, "debug": ds.Bool(required=False, default=False)})
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def write(self, name, content, mtime=None):
+		path = os.path.join(self.directory, name)
+		with open(path + ".tmp", "wb") as f:
+			f.write(content)
+		if mtime is not None: # The mtime may not change within the resolution of the filesystem otherwise
+			os.utime(path + ".tmp", (mtime, mtime))
+		os.rename(path + ".tmp", path) # So the polling thread doesn't read half-written files
+		return path
+
+	def parse(self, content):
+		self.parsed.append(content)
+		return json.loads(content.decode("utf-8"))
+
+	def test_reload_on_change(self):
+		path = self.write("config.json", b'{"port": 80}', 1000)
+		reloader = self.schema.reloader(path, parse=self.parse)
+		self.assertEqual(reloader.value, {"port": 80, "debug": False})
+		self.assertFalse(reloader.check())
+
+		self.write("config.json", b'{"port": 80}', 2000) # Same content
+		self.assertFalse(reloader.check())
+		self.assertEqual(len(self.parsed), 1)
+
+		value = reloader.value
+		self.write("config.json", b'{"port": 81}', 3000)
+		self.assertTrue(reloader.check())
+		self.assertEqual(reloader.value, {"port": 81, "debug": False})
+		self.assertEqual(value, {"port": 80, "debug": False}) # The old value is replaced, not changed
+
+	def test_invalid_content_keeps_value(self):
+		path = self.write("config.json", b'{"port": 80}', 1000)
+		reloader = self.schema.reloader(path, parse=self.parse)
+		for number, content in enumerate([b'{"port": "x"}', b'{"port": ']):
+			self.write("config.json", content, 2000 + number)
+			with self.assertRaises((ValueError, ds.ValidationError)):
+				reloader.check()
+			self.assertEqual(reloader.value, {"port": 80, "debug": False})
+			self.assertIsNotNone(reloader.error)
+			self.assertFalse(reloader.check()) # Not parsed again, until the file changes
+		self.write("config.json", b'{"port": 82}', 3000)
+		self.assertTrue(reloader.check())
+		self.assertEqual((reloader.value["port"], reloader.error), (82, None))
+		with self.assertRaises(ds.ValidationError):
+			self.schema.reloader(self.write("broken.json", b'{}'))
+		with self.assertRaises(ds.ValidationError): # Validated, even though there is nothing to load
+			self.schema.reloader(os.path.join(self.directory, "missing.json"))
+
+	def test_layers(self):
+		defaults = self.write("defaults.json", b'{"port": 80, "debug": true}', 1000)
+		site = os.path.join(self.directory, "site.json")
+		reloader = self.schema.reloader([defaults, site])
+		self.assertEqual(reloader.value, {"port": 80, "debug": True})
+		self.write("site.json", b'{"port": 81}', 2000)
+		self.assertTrue(reloader.check())
+		self.assertEqual(reloader.value, {"port": 81, "debug": True})
+		os.remove(site)
+		self.assertTrue(reloader.check())
+		self.assertEqual(reloader.value, {"port": 80, "debug": True})
+
+	def test_polling(self):
+		path = self.write("config.json", b'{"port": 80}', 1000)
+		errors = []
+		with self.schema.reloader(path, interval=0.01, on_error=errors.append) as reloader:
+			self.write("config.json", b'{"port": "x"}', 2000)
+			deadline = time.time() + 5
+			while not errors and time.time() < deadline:
+				time.sleep(0.01)
+			self.write("config.json", b'{"port": 81}', 3000)
+			while reloader.value["port"] != 81 and time.time() < deadline:
+				time.sleep(0.01)
+		self.assertEqual(reloader.value["port"], 81)
+		self.assertEqual(len(errors), 1)
+		self.assertIsInstance(errors[0], ds.ValidationError)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from .testcase import TestCase
+import dataschema as ds
+from dataschema.stream import iter_json_array, iter_json_lines
+import io
+import json
+
+
+class StreamTests(TestCase):
+
+	def test_iter_json_array(self):
+		data = [1, -2.5e3, "a,]", {"a": [1, {"b": None}]}, [], True, u"ä€", 12345678901234]
+		document = json.dumps(data, indent=1, ensure_ascii=False).encode("utf-8")
+		for chunksize in (1, 2, 3, 7, 64):
+			self.assertEqual(list(iter_json_array(io.BytesIO(document), chunksize)), data)
+		self.assertEqual(list(iter_json_array(io.StringIO(document.decode("utf-8")), 5)), data)
+		self.assertEqual(list(iter_json_array(io.BytesIO(b" [ ] "))), [])
+
+	def test_iter_json_array_invalid(self):
+		for document in [b"", b"{}", b"[1, 2", b"[1 2]", b"[1,", b"[{\"a\": }]"]:
+			with self.assertRaises(ValueError):
+				list(iter_json_array(io.BytesIO(document), 2))
+
+	def test_iter_json_array_invalid_fails_early(self):
+		stream = io.BytesIO(b"[1, {\"a\": x}, " + b",".join([b"1"] * 10000) + b"]")
+		elements = iter_json_array(stream, 16)
+		next(elements)
+		self.assertRaises(ValueError, next, elements)
+		self.assertLess(stream.tell(), 100)
+
+		# Values cut by the end of a read are still read completely
+		data = [u"abc\u00e4" * 10, -float("inf"), False, 1.5e-10, {"a": [u"\u20ac"]}]
+		document = json.dumps(data).encode("utf-8")
+		for chunksize in (1, 2, 3, 5):
+			self.assertEqual(list(iter_json_array(io.BytesIO(document), chunksize)), data)
+
+	def test_iter_json_array_reads_lazily(self):
+		stream = io.BytesIO(b"[" + b",".join([b"1"] * 10000) + b"]")
+		elements = iter_json_array(stream, 16)
+		next(elements)
+		self.assertLess(stream.tell(), 100)
+
+	def test_validate_json_array(self):
+		cs = ds.List({"a": int, "b": ds.Int(default=2)})
+		stream = io.BytesIO(b'[{"a": 1}, {"a": "x"}, {"a": 3, "b": 4}]')
+		results = list(cs.validate_json_array(stream, on_error="yield", chunksize=4))
+		self.assertEqual(results[0], {"a": 1, "b": 2})
+		self.assertEqual(results[1].index, 1)
+		self.assertEqual(results[2], {"a": 3, "b": 4})
+
+	def test_validate_json_lines(self):
+		cs = ds.Dict({"a": int})
+		stream = io.BytesIO(b'{"a": 1}\n\n{"a": 2}\n')
+		self.assertEqual(list(cs.validate_json_lines(stream)), [{"a": 1}, {"a": 2}])
+
+		with self.assertRaises(ds.ValidationError):
+			list(cs.validate_json_lines(io.BytesIO(b'{"a": "x"}\n')))
+		with self.assertRaises(ValueError):
+			list(cs.validate_json_lines(io.BytesIO(b'{"a": 1}\n{"a": \n')))
@@ -0,0 +1,116 @@
+from .testcase import TestCase
+import dataschema as ds
+from dataschema import vector
+import decimal
+import array
+import unittest
+
+
+class VectorizedListTests(TestCase):
+
+	def test_numeric_plan(self):
+		self.assertEqual(vector.numeric_plan(ds.Int()), (int, []))
+		self.assertEqual(vector.numeric_plan(ds.And(float, ds.Range(0, 1), ds.Max(0.5))), (float, [(0, 1), (None, 0.5)]))
+		self.assertIsNone(vector.numeric_plan(ds.And(ds.Range(0, 1), int)))
+		self.assertIsNone(vector.numeric_plan(ds.And(int, ds.Check(bool))))
+		self.assertIsNone(vector.numeric_plan(ds.Bool()))
+		self.assertIsNone(ds.List([str], vectorize=True).numeric_plan)
+
+	def test_same_results_as_element_by_element(self):
+		for vectorize in (False, True):
+			cs = ds.List(ds.And(int, ds.Range(0, 10)), vectorize=vectorize)
+			self.assertValidates(cs, [0, 5, 10], [0, 5, 10])
+			self.assertValidates(cs, [], [])
+			self.assertFails(cs, [0, 11, -1], u"Range List -> And -> Range: Value 11 > Max 10")
+			self.assertFails(cs, [0, 1.5])
+			self.assertFails(cs, [0, None])
+
+			cs = ds.List(ds.And(ds.Decimal(), ds.Min(decimal.Decimal("0.5"))), vectorize=vectorize)
+			self.assertValidates(cs, [decimal.Decimal("0.5"), decimal.Decimal(2)], [decimal.Decimal("0.5"), decimal.Decimal(2)])
+			self.assertFails(cs, [decimal.Decimal("0.4")])
+
+	def test_compiled(self):
+		validate = ds.List(ds.And(float, ds.Max(1.0)), vectorize=True).compile()
+		self.assertEqual(validate([0.5, 1.0]), [0.5, 1.0])
+		with self.assertRaises(ds.ValidationError):
+			validate([0.5, 1.5])
+
+	@unittest.skipIf(vector.numpy is None, "numpy is not installed")
+	def test_check_numeric(self):
+		plan = (int, [(0, 10)])
+		self.assertEqual(vector.check_numeric(plan, [1, 2, 3]), -1)
+		self.assertEqual(vector.check_numeric(plan, [1, 20, -3]), 1)
+		self.assertIsNone(vector.check_numeric(plan, [1, "a"]))
+		self.assertIsNone(vector.check_numeric(plan, [2 ** 70]))
+		self.assertEqual(vector.check_numeric((int, [(0.5, None)]), [1, 0]), 1)
+
+	@unittest.skipIf(vector.numpy is not None, "numpy is installed")
+	def test_without_numpy(self):
+		self.assertIsNone(vector.check_numeric((int, [(0, 10)]), [1, 2, 3]))
+
+
+class BufferListTests(TestCase):
+
+	def test_array(self):
+		values = array.array("d", [0.5, 1.0])
+		self.assertIs(ds.List([float]).validate(values), values)
+		self.assertIs(ds.List(ds.And(float, ds.Range(0, 1))).validate(values), values)
+		self.assertFails(ds.List(ds.And(float, ds.Max(0.7))), values, u"Range List -> And -> Max: Value 1.0 > Max 0.7")
+		self.assertFails(ds.List([int]), values)
+
+	def test_converted_elements_are_copied(self):
+		values = array.array("i", [1, 2])
+		self.assertEqual(ds.List(ds.Call(lambda v: v * 2)).validate(values), [2, 4])
+		self.assertIs(ds.List(ds.Check(bool)).validate(values), values)
+
+	def test_memoryview(self):
+		values = memoryview(b"ab")
+		self.assertIs(ds.List([int]).validate(values), values)
+		self.assertFails(ds.List(ds.And(int, ds.Max(97))), values)
+		self.assertIs(ds.List([int]).compile()(values), values)
+
+	@unittest.skipIf(vector.numpy is None, "numpy is not installed")
+	def test_ndarray(self):
+		values = vector.numpy.arange(10)
+		self.assertIs(ds.List(ds.And(int, ds.Min(0))).validate(values), values)
+		self.assertFails(ds.List(ds.And(int, ds.Min(1))), values)
+		self.assertFails(ds.List([int]), vector.numpy.zeros((2, 2)))
+
+	@unittest.skipIf(vector.numpy is None, "numpy is not installed")
+	def test_ndarray_in_other_tokens(self):
+		values = vector.numpy.arange(3)
+		self.assertIs(ds.Or(int, {"a": int}, [int]).validate(values), values)
+		self.assertFails(ds.Dict({"a": int}), values)
+
+	@unittest.skipIf(vector.numpy is None, "numpy is not installed")
+	def test_ndarray_elements_are_python_objects(self):
+		values = vector.numpy.arange(3)
+		self.assertIs(ds.List(ds.And(int, ds.Check(lambda v: v < 3))).validate(values), values)
+		doubled = ds.List(ds.And(int, ds.Call(lambda v: v * 2))).validate(values)
+		self.assertEqual((doubled, type(doubled[0])), ([0, 2, 4], int))
+		self.assertFails(ds.List(ds.And(int, ds.Check(lambda v: v < 2))), values)
+
+	def test_revalidate_buffers(self):
+		checked = []
+		cs = ds.Dict({"a": ds.Check(lambda v: checked.append(v) or True), "b": ds.Check(bool)})
+		previous = {"a": array.array("i", [1, 2]), "b": memoryview(b"ab")}
+		result = cs.validate(previous)
+		del checked[:]
+		self.assertIs(cs.revalidate(previous, result, {"a": array.array("i", [1, 2]), "b": memoryview(b"ab")}), result)
+		self.assertEqual(checked, [])
+		cs.revalidate(previous, result, {"a": array.array("l", [1, 2]), "b": memoryview(b"ab")})
+		self.assertEqual(len(checked), 1)
+
+	@unittest.skipIf(vector.numpy is None, "numpy is not installed")
+	def test_revalidate_ndarray(self):
+		checked = []
+		cs = ds.Dict({"a": ds.Check(lambda v: checked.append(v) or True)})
+		previous = {"a": vector.numpy.arange(3)}
+		result = cs.validate(previous)
+		del checked[:]
+		self.assertIs(cs.revalidate(previous, result, {"a": vector.numpy.arange(3)}), result)
+		self.assertEqual(checked, [])
+		changed = {"a": vector.numpy.arange(4)}
+		self.assertIs(cs.revalidate(previous, result, changed)["a"], changed["a"])
+		cs.revalidate(previous, result, {"a": vector.numpy.arange(3.0)})
+		self.assertEqual(len(checked), 2)